@@ -1,17 +1,22 @@
+import sys
 import time
-from uuid import UUID
 from typing import Annotated
 
 from loguru import logger
 from fastapi import Header, Depends, Request
-from cachetools import TTLCache
+from redis.asyncio import Redis
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.security.utils import get_authorization_scheme_param
 
 from core.types import ApiException, RequestHeaderKeyEnum
+from util.cache import StatsTTLCache, StatsTLRUCache
 from config.main import local_configs
 from util.encrypt import HashUtil
 from core.response import ResponseCodeEnum
+from ext.ext_redis import keys
+from ext.ext_redis.scripts import token_permission_check
+from ext.ext_redis.tracking import tracking_cache
+from ext.ext_redis.broadcast import InvalidationTopicEnum, invalidation_bus
 from ext.ext_tortoise.models.user_center import Account
 
 
@@ -45,63 +50,168 @@ class TheBearer(HTTPBearer):
 
 auth_schema = TheBearer()
 
-_account_cache = TTLCache(maxsize=256, ttl=60)
+_account_cache = StatsTTLCache(
+    maxsize=local_configs.server.local_cache.account_maxsize,
+    ttl=local_configs.server.local_cache.account_ttl,
+)
+_account_cache_generation = 0
 
 
-async def _get_account_by_id(account_id: UUID) -> Account:
-    if account_id in _account_cache:
-        return _account_cache[account_id]
+def _invalidate_account_cache(account_ids: list[str] | None) -> None:
+    global _account_cache_generation
+    _account_cache_generation += 1
+    if account_ids is None:
+        _account_cache.clear()
+        return
+    for account_id in account_ids:
+        _account_cache.pop(account_id, None)
+
+
+invalidation_bus.subscribe(InvalidationTopicEnum.account.value, _invalidate_account_cache)
+
+
+async def _get_account_by_id(account_id: str) -> Account:
+    acc = _account_cache.get(account_id)
+    if acc:
+        return acc
+    generation = _account_cache_generation
     acc = await Account.get_or_none(id=account_id, deleted_at=0)
     if not acc:
         raise ApiException(
             code=ResponseCodeEnum.unauthorized,
             message="Invalid Account",
         )
-    _account_cache[account_id] = acc
+    if generation == _account_cache_generation:
+        _account_cache[account_id] = acc
     return acc
 
 
-async def _validate_jwt_token(request: Request, token: HTTPAuthorizationCredentials) -> Account:
+# token -> (account_id, scene, ttl), 过期时间取 redis 剩余 TTL 与本地 TTL 的较小值
+_token_cache = StatsTLRUCache(
+    maxsize=local_configs.server.local_cache.token_maxsize,
+    ttu=lambda _, value, now: now + value[2],
+)
+# 每次失效 +1, 用于丢弃失效前发起的回源结果
+_token_cache_generation = 0
+
+
+def _invalidate_token_cache(tokens: list[str] | None) -> None:
+    global _token_cache_generation
+    _token_cache_generation += 1
+    if tokens is None:
+        _token_cache.clear()
+        return
+    for token in tokens:
+        _token_cache.pop(token, None)
+
+
+invalidation_bus.subscribe(InvalidationTopicEnum.token.value, _invalidate_token_cache)
+
+
+async def resolve_token(token: str) -> tuple[str, str] | None:
+    """token -> (account_id, scene), 走本地缓存, 不校验场景与账户状态; token 无效时返回 None"""
+    cached = _token_cache.get(token)
+    if cached:
+        return cached[0], cached[1]
+
+    generation = _token_cache_generation
+    token_key = keys.token_key(token)
+    token_identifier, pttl = await _get_token(local_configs.extensions.redis.read_client, token_key)
+    if not token_identifier and local_configs.extensions.redis.read_from_replicas:
+        # 刚登录的 token 可能还未同步到副本
+        token_identifier, pttl = await _get_token(local_configs.extensions.redis.client, token_key)
+
+    if not token_identifier:
+        return None
+
+    return _cache_token(token, token_identifier, pttl, generation)
+
+
+async def _get_token(r: Redis, token_key: str) -> tuple[str | None, int]:
+    async with r.pipeline(transaction=False) as pipe:
+        pipe.get(token_key)
+        pipe.pttl(token_key)
+        token_identifier, pttl = await pipe.execute()
+    return token_identifier, pttl
+
+
+async def _resolve_token_with_permissions(
+    token: str,
+    account_id: str,
+    apis: list[str],
+) -> tuple[tuple[str, str] | None, bool]:
+    """token -> (account_id, scene) 与权限校验合并为一次 redis 往返, account_id 取自 token 前缀"""
+    generation = _token_cache_generation
     async with local_configs.extensions.redis.instance as r:
-        token_identifier = await r.get(
-            keys.UserCenterKey.Token2AccountKey.format(  # type: ignore
-                token=token.credentials,
-            ),
+        result = await token_permission_check(
+            r,
+            keys=[
+                keys.token_key(token),
+                keys.UserCenterKey.AccountApiPermissionSet.format(uuid=account_id),  # type: ignore
+            ],
+            args=apis,
         )
 
-        if not token_identifier:
-            logger.warning("token缓存失效")
-            raise ApiException(
-                code=ResponseCodeEnum.unauthorized.value,
-                message="登录失效或已在其他地方登录",
-            )
+    token_identifier = result[0]
+    if not token_identifier:
+        return None, False
+    return _cache_token(token, token_identifier, result[1], generation), 1 in result[2:]
 
-        account_id, scene = token_identifier.split(":")
 
-        if request.headers.get(RequestHeaderKeyEnum.front_scene.value) and scene != request.headers.get(
-            RequestHeaderKeyEnum.front_scene.value,
-        ):
-            logger.warning("token场景不匹配")
-            raise ApiException(
-                code=ResponseCodeEnum.unauthorized.value,
-                message="token异常使用",
-            )
+def _cache_token(token: str, token_identifier: str, pttl: int, generation: int) -> tuple[str, str]:
+    account_id, scene = token_identifier.split(":")
+    local_ttl = local_configs.server.local_cache.token_ttl
+    if local_ttl > 0 and generation == _token_cache_generation:
+        _token_cache[token] = (
+            account_id,
+            scene,
+            min(local_ttl, pttl / 1000) if pttl > 0 else local_ttl,
+        )
+    return account_id, scene
 
-        account = await _get_account_by_id(account_id)
 
-        if not account:
-            logger.warning("token账户不存在")
-            raise ApiException(
-                code=ResponseCodeEnum.unauthorized.value,
-                message="授权头无效",
-            )
+def _raise_token_invalid() -> None:
+    logger.warning("token缓存失效")
+    raise ApiException(
+        code=ResponseCodeEnum.unauthorized.value,
+        message="登录失效或已在其他地方登录",
+    )
 
-        # set scope
-        request.scope["user"] = account
-        request.scope["scene"] = scene
-        request.scope["is_staff"] = account.is_staff
-        request.scope["is_super_admin"] = account.is_super_admin
-        return account
+
+async def _validate_jwt_token(request: Request, token: HTTPAuthorizationCredentials) -> Account:
+    token_identifier = await resolve_token(token.credentials)
+
+    if not token_identifier:
+        _raise_token_invalid()
+
+    return await _authenticate(request, *token_identifier)  # type: ignore
+
+
+async def _authenticate(request: Request, account_id: str, scene: str) -> Account:
+    if request.headers.get(RequestHeaderKeyEnum.front_scene.value) and scene != request.headers.get(
+        RequestHeaderKeyEnum.front_scene.value,
+    ):
+        logger.warning("token场景不匹配")
+        raise ApiException(
+            code=ResponseCodeEnum.unauthorized.value,
+            message="token异常使用",
+        )
+
+    account = await _get_account_by_id(account_id)
+
+    if not account:
+        logger.warning("token账户不存在")
+        raise ApiException(
+            code=ResponseCodeEnum.unauthorized.value,
+            message="授权头无效",
+        )
+
+    # set scope
+    request.scope["user"] = account
+    request.scope["scene"] = scene
+    request.scope["is_staff"] = account.is_staff
+    request.scope["is_super_admin"] = account.is_super_admin
+    return account
 
 
 class TokenRequired:
@@ -119,6 +229,82 @@ class TokenRequired:
 token_required = TokenRequired()
 
 
+class LocalPermissionMatcher:
+    """账户权限集合常驻 worker 内存, 权限校验不再访问 redis
+
+    权限集合按账户缓存为 (版本号, frozenset), 权限码与路由候选码均 intern, 集合运算只比较指针;
+    update_cache_permissions 每次刷新版本号 +1 并广播, 低于该版本的本地集合被淘汰.
+    """
+
+    # account_id -> (version, codes)
+    _cache: StatsTTLCache
+    # 已知的最新版本号, 丢弃加载期间已过期的结果; 与权限集合同样按 TTL 淘汰
+    _latest_versions: StatsTTLCache
+    # (app code, method, root_path, route path) -> 候选权限码
+    _route_candidates: dict[tuple[str, str, str, str], tuple[str, ...]]
+
+    def __init__(self, maxsize: int, ttl: int) -> None:
+        self._cache = StatsTTLCache(maxsize=maxsize, ttl=ttl)
+        self._latest_versions = StatsTTLCache(maxsize=maxsize, ttl=ttl)
+        self._route_candidates = {}
+
+    def invalidate(self, items: list[str] | None) -> None:
+        if items is None:
+            self._cache.clear()
+            self._latest_versions.clear()
+            return
+        for item in items:
+            account_id, _, version_str = item.rpartition(":")
+            version = int(version_str)
+            if version > self._latest_versions.get(account_id, 0):
+                self._latest_versions[account_id] = version
+            if account_id in self._cache and self._cache[account_id][0] < version:
+                self._cache.pop(account_id, None)
+
+    def candidates(self, request: Request) -> tuple[str, ...]:
+        key = (request.app.code, request.method, request.scope["root_path"], request.scope["route"].path)
+        apis = self._route_candidates.get(key)
+        if apis is None:
+            code, method, root_path, path = key
+            apis = tuple(sys.intern(i) for i in ("*", f"{code}:*", f"{code}:{method}:{root_path}{path}"))
+            self._route_candidates[key] = apis
+        return apis
+
+    async def _load(self, account: Account) -> frozenset[str]:
+        account_id = str(account.id)
+        # 先取版本号再加载, 加载期间发生的刷新会使版本号落后而不被缓存
+        async with local_configs.extensions.redis.instance as r:
+            # 读取时顺延过期时间, 保证 key 在本地缓存的有效期内不会过期重置
+            version = int(
+                await r.getex(
+                    keys.UserCenterKey.AccountApiPermissionVersion.format(uuid=account_id),  # type: ignore
+                    ex=local_configs.server.local_cache.permission_version_ttl,
+                )
+                or 0,
+            )
+        codes = frozenset(sys.intern(i) for i in await account.get_permission_codes())
+        if version >= self._latest_versions.get(account_id, 0):
+            self._cache[account_id] = (version, codes)
+        return codes
+
+    async def has_permission(self, account: Account, apis: tuple[str, ...]) -> bool:
+        cached = self._cache.get(str(account.id))
+        codes = cached[1] if cached else await self._load(account)
+        return not codes.isdisjoint(apis)
+
+    @property
+    def stats(self) -> dict[str, int | float]:
+        return self._cache.stats
+
+
+permission_matcher = LocalPermissionMatcher(
+    maxsize=local_configs.server.local_cache.permission_maxsize,
+    ttl=local_configs.server.local_cache.permission_ttl,
+)
+
+invalidation_bus.subscribe(InvalidationTopicEnum.permission.value, permission_matcher.invalidate)
+
+
 class ApiPermissionCheck:
     def __init__(
         self,
@@ -130,24 +316,33 @@ class ApiPermissionCheck:
         request: Request,
         token: Annotated[HTTPAuthorizationCredentials, Depends(auth_schema)],
     ) -> Account:
+        apis = permission_matcher.candidates(request)
+
         account: Account | None = request.scope.get("user")  # type: ignore
-        if not account:
+        local_mode = local_configs.server.local_cache.permission_mode == "local"
+        account_id = keys.token_account_id(token.credentials)
+        if not account and (local_mode or account_id is None):
+            # 旧格式 token 不含账户ID, 无法预先得到权限集合 key, 不走合并脚本
             account = await token_required(request, token)
-
-        if account.is_super_admin:
-            return account
-
-        method = request.method
-        root_path: str = request.scope["root_path"]
-        path: str = request.scope["route"].path
-
-        if await account.has_permission(
-            [
-                "*",
-                f"{request.app.code}:*",
-                f"{request.app.code}:{method}:{root_path}{path}",
-            ],
-        ):
+        if local_mode:
+            # token/账户/权限均走本地缓存
+            if account.is_super_admin:  # type: ignore
+                return account
+            granted = await permission_matcher.has_permission(account, apis)
+        elif account:
+            if account.is_super_admin:
+                return account
+            granted = await account.has_permission(list(apis))
+        else:
+            # token 与权限一次往返, 账户走本地缓存
+            token_identifier, granted = await _resolve_token_with_permissions(token.credentials, account_id, list(apis))  # type: ignore
+            if not token_identifier:
+                _raise_token_invalid()
+            account = await _authenticate(request, *token_identifier)  # type: ignore
+            if account.is_super_admin:
+                return account
+
+        if granted:
             return account
 
         raise ApiException(
@@ -211,9 +406,46 @@ class StaffAdminRequired:
 staff_admin_required = StaffAdminRequired()
 
 
+async def resolve_api_key(request: Request) -> str | None:
+    """校验 ApiKey 时间戳与签名, 通过时返回 ApiKey 并记录在 request.scope, 供鉴权前的限流使用; 未通过返回 None"""
+    if api_key := request.scope.get("api_key"):
+        return api_key
+    api_key, timestamp, sign = (request.headers.get(i) for i in ("x-api-key", "x-timestamp", "x-sign"))
+    if not (api_key and timestamp and sign and timestamp.isdigit()) or abs(int(time.time()) - int(timestamp)) > 30:
+        return None
+
+    redis = local_configs.extensions.redis
+    secret_key_name = keys.UserCenterKey.ApiSecretKey.format(api_key=api_key)  # type: ignore
+    secret_key = await tracking_cache.get(redis.read_client, secret_key_name)
+    if not secret_key and redis.read_from_replicas:
+        secret_key = await tracking_cache.get(redis.client, secret_key_name)
+    if not secret_key or HashUtil.hmac_sha256_encode(k=secret_key, s=f"{api_key}&{timestamp}") != sign:
+        return None
+    request.scope["api_key"] = api_key
+    return api_key
+
+
 class ApiKeyPermissionCheck:
     """外部api key权限校验"""
 
+    @staticmethod
+    async def _fetch(r: Redis, secret_key_name: str, perm_key_name: str, apis: list[str]) -> tuple[str | None, list]:
+        # 启用客户端缓存的 key 从本地读取, 其余 key 合并为一次往返
+        secret_tracked = tracking_cache.tracks(secret_key_name)
+        perm_tracked = tracking_cache.tracks(perm_key_name)
+        fetched: list = []
+        if not (secret_tracked and perm_tracked):
+            async with r.pipeline(transaction=False) as pipe:
+                if not secret_tracked:
+                    pipe.get(secret_key_name)
+                if not perm_tracked:
+                    pipe.smismember(name=perm_key_name, values=apis)
+                fetched = await pipe.execute()
+        results = iter(fetched)
+        secret_key = await tracking_cache.get(r, secret_key_name) if secret_tracked else next(results)
+        is_ok = await tracking_cache.smismember(r, perm_key_name, apis) if perm_tracked else next(results)
+        return secret_key, is_ok
+
     async def __call__(
         self,
         request: Request,
@@ -233,24 +465,25 @@ class ApiKeyPermissionCheck:
                 code=ResponseCodeEnum.unauthorized.value,
             )
 
-        redis_api_secret_key = keys.RedisCacheKey.ApiSecretKey.format(  # type: ignore
+        redis_api_secret_key = keys.UserCenterKey.ApiSecretKey.format(  # type: ignore
             api_key=x_api_key,
         )
-        redis_perm_key = keys.RedisCacheKey.ApiKeyPermissionSet.format(  # type: ignore
+        redis_perm_key = keys.UserCenterKey.ApiKeyPermissionSet.format(  # type: ignore
             api_key=x_api_key,
         )
-
-        async with local_configs.extensions.redis.instance as r:
-            async with r.pipeline() as pipe:
-                pipe.get(redis_api_secret_key)
-                pipe.smismember(
-                    name=redis_perm_key,
-                    values=[
-                        f"{request.app.code}:*",
-                        f'{request.app.code}:{request.method}:{request.scope["root_path"]}{request.scope["route"].path}',
-                    ],
-                )
-                secret_key, is_ok = await pipe.execute()
+        apis = [
+            f"{request.app.code}:*",
+            f'{request.app.code}:{request.method}:{request.scope["root_path"]}{request.scope["route"].path}',
+        ]
+
+        # 密钥与权限集合使用同一 hash tag, 集群模式下也在同一个 slot
+        secret_key, is_ok = await self._fetch(
+            local_configs.extensions.redis.read_client, redis_api_secret_key, redis_perm_key, apis
+        )
+        if not secret_key and local_configs.extensions.redis.read_from_replicas:
+            secret_key, is_ok = await self._fetch(
+                local_configs.extensions.redis.client, redis_api_secret_key, redis_perm_key, apis
+            )
         if not secret_key:
             raise ApiException(
                 message="无效的ApiKey",
@@ -273,6 +506,7 @@ class ApiKeyPermissionCheck:
                 message="禁止访问",
                 code=ResponseCodeEnum.forbidden.value,
             )
+        request.scope["api_key"] = x_api_key
         request.scope["scene"] = "ApiCall"
         request.scope["is_staff"] = False
         request.scope["is_super_admin"] = False
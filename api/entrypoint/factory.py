@@ -1,5 +1,7 @@
-from core.api import ApiApplication, lifespan
+from core.api import ApiApplication
 from config.main import local_configs
+from api.lifespan import lifespan
+from core.response import AesResponse
 from api.second.factory import second_api
 from api.user_center.factory import user_center_api
 
@@ -21,6 +23,8 @@ Knowledge-Base: <a href="/second/docs/">第二服務接口文档</a>
 service_api = RootApi(
     code="ServiceRoot",
     settings=local_configs,
+    # Resp 直接序列化为 orjson.Fragment 输出
+    default_response_class=AesResponse,
     lifespan=lifespan,
     title="主服务",
     description=description,
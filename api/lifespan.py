@@ -0,0 +1,18 @@
+from contextlib import asynccontextmanager
+from collections.abc import AsyncGenerator
+
+from core.api import ApiApplication
+from core.api import lifespan as core_lifespan
+from api.service.captcha.helper import captcha_pool
+
+
+@asynccontextmanager
+async def lifespan(api: ApiApplication) -> AsyncGenerator:
+    """在 core 的 lifespan 之上启停 api 层的后台任务"""
+    async with core_lifespan(api):
+        # 图片验证码预渲染
+        captcha_pool.start()
+        try:
+            yield
+        finally:
+            await captcha_pool.stop()
@@ -0,0 +1,204 @@
+"""接口限流
+
+RateLimiter(ip="20/60") 作为路由依赖声明单个接口的规则, app_rate_limit 挂在 ApiApplication 上按 code 读取应用级规则,
+两者计数互不影响. 每个维度先经 worker 内令牌桶预检: 容量为次数上限, 按 上限/窗口 的速率补充, 只扣除 redis 放行的请求,
+所以本地令牌耗尽时该客户端在 redis 中必然也已超限, 直接拒绝, 不再访问 redis.
+"""
+
+import math
+import time
+import uuid
+from typing import Literal
+from functools import lru_cache
+
+from loguru import logger
+from fastapi import Request
+from fastapi.security.utils import get_authorization_scheme_param
+
+from api.depend import resolve_token, resolve_api_key, permission_matcher
+from core.types import ApiException
+from util.cache import StatsLRUCache
+from config.main import local_configs
+from core.response import ResponseCodeEnum
+from config.default import RateLimitDimension
+from ext.ext_redis.keys import GeneralCacheKey
+from ext.ext_redis.scripts import sliding_window_limit
+
+
+@lru_cache
+def parse_rule(rule: str) -> tuple[int, int]:
+    """规则 "次数/秒数" -> (次数, 窗口毫秒数)"""
+    limit, seconds = rule.split("/")
+    if int(limit) <= 0 or int(seconds) <= 0:
+        raise ValueError(f"invalid rate limit rule: {rule}")
+    return int(limit), int(seconds) * 1000
+
+
+class TokenBucket:
+    __slots__ = ("capacity", "window_ms", "rate", "tokens", "updated_at")
+
+    capacity: int
+    window_ms: int
+    rate: float  # 每秒补充的令牌数
+    tokens: float
+    updated_at: float
+
+    def __init__(self, limit: int, window_ms: int) -> None:
+        self.capacity = limit
+        self.window_ms = window_ms
+        self.rate = limit * 1000 / window_ms
+        self.tokens = limit
+        self.updated_at = time.monotonic()
+
+    def wait(self, now: float) -> float:
+        """补充令牌, 返回距离有可用令牌的秒数, 0 表示可用"""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        return 0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def refund(self) -> None:
+        self.tokens = min(self.capacity, self.tokens + 1)
+
+
+# redis key -> 令牌桶
+_buckets = StatsLRUCache(maxsize=local_configs.server.rate_limit.local_maxsize)
+_counters = {"local_rejected": 0, "redis_rejected": 0, "redis_errors": 0}
+
+
+def _bucket(key: str, limit: int, window_ms: int) -> TokenBucket:
+    bucket = _buckets.get(key)
+    # 规则变更后按新的容量与补充速率重建
+    if bucket is None or bucket.capacity != limit or bucket.window_ms != window_ms:
+        bucket = _buckets[key] = TokenBucket(limit, window_ms)
+    return bucket
+
+
+def rate_limit_stats() -> dict[str, int | float]:
+    return {**_counters, **{f"bucket_{k}": v for k, v in _buckets.stats.items()}}
+
+
+async def _identities(request: Request, dimensions: list[RateLimitDimension]) -> dict[str, str]:
+    identities = {}
+    if "account" in dimensions:
+        account = request.scope.get("user")
+        if account:
+            identities["account"] = str(account.id)
+        else:
+            # 限流先于鉴权执行, 从 token 解析账户, token 无效时不按账户限流
+            scheme, credentials = get_authorization_scheme_param(request.headers.get("Authorization"))
+            token_identifier = await resolve_token(credentials) if scheme == "Bearer" and credentials else None
+            if token_identifier:
+                identities["account"] = token_identifier[0]
+    if "api_key" in dimensions and request.headers.get("x-api-key"):
+        api_key = await resolve_api_key(request)
+        if api_key:
+            identities["api_key"] = api_key
+        elif request.client:
+            # 签名未通过时按 IP 计数, 伪造的请求不占用真实 ApiKey 的次数, 也不会产生任意多的计数 key
+            identities["api_key"] = f"unverified:{request.client.host}"
+    if "ip" in dimensions and request.client:
+        identities["ip"] = request.client.host
+    return identities
+
+
+async def _check_redis(checks: list[tuple[str, int, int]]) -> tuple[bool, int]:
+    """返回 (是否放行, 重试毫秒数)"""
+    member = uuid.uuid4().hex
+    redis = local_configs.extensions.redis
+    if redis.mode == "cluster" and len(checks) > 1:
+        # 各维度 key 不在同一个 slot, 逐个检查; 任一维度拒绝时撤销其他维度已计入的本次请求
+        results = [
+            await sliding_window_limit(redis.client, keys=[key], args=[member, str(window), str(limit)])
+            for key, limit, window in checks
+        ]
+        if all(result[0] for result in results):
+            return True, 0
+        async with redis.client.pipeline() as pipe:
+            for (key, _, _), result in zip(checks, results, strict=True):
+                if result[0]:
+                    pipe.zrem(key, member)
+            await pipe.execute()
+        return False, max(int(result[1]) for result in results)
+    args = [member]
+    for _, limit, window in checks:
+        args += [str(window), str(limit)]
+    result = await sliding_window_limit(redis.client, keys=[key for key, _, _ in checks], args=args)
+    return bool(result[0]), int(result[1])
+
+
+def _raise_limited(seconds: float) -> None:
+    raise ApiException(
+        code=ResponseCodeEnum.request_limited.value,
+        message=f"{ResponseCodeEnum.request_limited.label}, 请{math.ceil(seconds)}秒后重试",
+    )
+
+
+class RateLimiter:
+    """按账户/ApiKey/IP 限流, 规则格式 "次数/秒数"
+
+    scope="route": 规则来自构造参数, 被 server.rate_limit.routes 中该接口权限码的配置覆盖;
+    scope="app": 规则来自 server.rate_limit.apps 中 request.app.code 的配置
+    """
+
+    scope: Literal["app", "route"]
+    rules: dict[RateLimitDimension, str]
+
+    def __init__(
+        self,
+        scope: Literal["app", "route"] = "route",
+        account: str | None = None,
+        api_key: str | None = None,
+        ip: str | None = None,
+    ) -> None:
+        self.scope = scope
+        self.rules = {k: v for k, v in (("account", account), ("api_key", api_key), ("ip", ip)) if v}  # type: ignore
+        for rule in self.rules.values():
+            parse_rule(rule)
+
+    def _resolve_rules(self, request: Request) -> tuple[str, dict[RateLimitDimension, str]]:
+        config = local_configs.server.rate_limit
+        if self.scope == "app":
+            return request.app.code, config.apps.get(request.app.code, {})
+        code = permission_matcher.candidates(request)[-1]
+        return code, {**self.rules, **config.routes.get(code, {})}
+
+    async def __call__(self, request: Request) -> None:
+        if not local_configs.server.rate_limit.enabled:
+            return
+        scope, rules = self._resolve_rules(request)
+        if not rules:
+            return
+        identities = await _identities(request, list(rules))
+        checks = [
+            (GeneralCacheKey.RateLimit.format(scope=scope, dimension=dimension, identity=identities[dimension]),)
+            + parse_rule(rule)
+            for dimension, rule in rules.items()
+            if dimension in identities
+        ]
+        if not checks:
+            return
+
+        now = time.monotonic()
+        buckets = [_bucket(*check) for check in checks]
+        wait = max(bucket.wait(now) for bucket in buckets)
+        if wait > 0:
+            _counters["local_rejected"] += 1
+            _raise_limited(wait)
+        for bucket in buckets:
+            bucket.tokens -= 1
+
+        try:
+            allowed, retry = await _check_redis(checks)  # type: ignore
+        except Exception as e:
+            # redis 不可用时只保留本地令牌桶的限制
+            _counters["redis_errors"] += 1
+            logger.warning(f"限流检查失败, 放行: {e}")
+            return
+        if not allowed:
+            _counters["redis_rejected"] += 1
+            for bucket in buckets:
+                bucket.refund()
+            _raise_limited(retry / 1000)
+
+
+app_rate_limit = RateLimiter(scope="app")
@@ -0,0 +1,116 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+from redis.asyncio import Redis
+from starlette.requests import Request
+
+from api import depend, limiter
+from api.limiter import TokenBucket, _bucket, parse_rule, _identities, _check_redis
+from util.encrypt import HashUtil
+from ext.ext_redis import keys
+from ext.ext_redis.scripts import sliding_window_limit
+
+
+def test_parse_rule() -> None:
+    assert parse_rule("20/60") == (20, 60000)
+    for rule in ("0/60", "20/0", "-1/60"):
+        with pytest.raises(ValueError):
+            parse_rule(rule)
+
+
+def test_token_bucket_refill() -> None:
+    bucket = TokenBucket(limit=2, window_ms=1000)
+    assert bucket.rate == 2
+    now = bucket.updated_at
+    assert bucket.wait(now) == 0
+    bucket.tokens -= 2
+    assert bucket.wait(now) == pytest.approx(0.5)
+    # 0.25 秒补充半个令牌, 仍需再等 0.25 秒
+    assert bucket.wait(now + 0.25) == pytest.approx(0.25)
+    assert bucket.wait(now + 0.5) == 0
+    # 补充不超过容量
+    assert bucket.wait(now + 100) == 0
+    assert bucket.tokens == 2
+    bucket.refund()
+    assert bucket.tokens == 2
+
+
+def test_bucket_rebuilt_on_rule_change() -> None:
+    key = "test:limiter:rule-change"
+    bucket = _bucket(key, 10, 60000)
+    bucket.tokens = 0
+    assert _bucket(key, 10, 60000) is bucket
+    # 次数不变窗口变化时补充速率不同, 需要重建
+    rebuilt = _bucket(key, 10, 1000)
+    assert rebuilt is not bucket
+    assert rebuilt.rate == 10
+    assert rebuilt.tokens == 10
+
+
+@pytest.fixture
+def fake_redis() -> Redis:
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    return fakeredis.FakeAsyncRedis(decode_responses=True)
+
+
+@pytest.mark.asyncio
+async def test_sliding_window_limit(fake_redis: Redis) -> None:
+    args = ["60000", "2"]
+    assert (await sliding_window_limit(fake_redis, keys=["a"], args=["m1", *args]))[0] == 1
+    assert (await sliding_window_limit(fake_redis, keys=["a"], args=["m2", *args]))[0] == 1
+    allowed, retry = await sliding_window_limit(fake_redis, keys=["a"], args=["m3", *args])
+    assert allowed == 0
+    assert 0 < retry <= 60000
+    assert await fake_redis.zcard("a") == 2
+
+
+@pytest.mark.asyncio
+async def test_sliding_window_limit_all_or_nothing(fake_redis: Redis) -> None:
+    await fake_redis.zadd("full", {"old": 1e15})
+    allowed, _ = await sliding_window_limit(fake_redis, keys=["free", "full"], args=["m", "60000", "5", "60000", "1"])
+    assert allowed == 0
+    # 任一维度超限时其他维度也不计入
+    assert await fake_redis.zcard("free") == 0
+
+
+@pytest.mark.asyncio
+async def test_check_redis_cluster_undo(fake_redis: Redis, monkeypatch: pytest.MonkeyPatch) -> None:
+    redis = SimpleNamespace(mode="cluster", client=fake_redis)
+    monkeypatch.setattr(limiter, "local_configs", SimpleNamespace(extensions=SimpleNamespace(redis=redis)))
+
+    assert await _check_redis([("free", 5, 60000), ("full", 1, 60000)]) == (True, 0)
+    allowed, retry = await _check_redis([("free", 5, 60000), ("full", 1, 60000)])
+    assert not allowed
+    assert 0 < retry <= 60000
+    # 被拒绝的请求从已放行维度中撤销
+    assert await fake_redis.zcard("free") == 1
+    assert await fake_redis.zcard("full") == 1
+
+
+def _request(headers: dict[str, str]) -> Request:
+    return Request(
+        {
+            "type": "http",
+            "headers": [(k.encode(), v.encode()) for k, v in headers.items()],
+            "client": ("1.2.3.4", 1234),
+        },
+    )
+
+
+@pytest.mark.asyncio
+async def test_api_key_identity_requires_signature(fake_redis: Redis, monkeypatch: pytest.MonkeyPatch) -> None:
+    redis = SimpleNamespace(read_client=fake_redis, client=fake_redis, read_from_replicas=False)
+    monkeypatch.setattr(depend, "local_configs", SimpleNamespace(extensions=SimpleNamespace(redis=redis)))
+    await fake_redis.set(keys.UserCenterKey.ApiSecretKey.format(api_key="ak"), "secret")
+    timestamp = str(int(time.time()))
+    sign = HashUtil.hmac_sha256_encode(k="secret", s=f"ak&{timestamp}")
+
+    request = _request({"x-api-key": "ak", "x-timestamp": timestamp, "x-sign": sign})
+    assert await _identities(request, ["api_key"]) == {"api_key": "ak"}
+    assert request.scope["api_key"] == "ak"
+    # 伪造的签名按来源 IP 计数, 不计入真实 ApiKey
+    request = _request({"x-api-key": "ak", "x-timestamp": timestamp, "x-sign": "forged"})
+    assert await _identities(request, ["api_key", "ip"]) == {"api_key": "unverified:1.2.3.4", "ip": "1.2.3.4"}
+    assert await _identities(_request({}), ["api_key"]) == {}
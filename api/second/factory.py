@@ -1,16 +1,23 @@
 from typing import Literal
 
-from core.api import ApiApplication, lifespan
+from fastapi import Depends
+
+from core.api import ApiApplication
+from api.limiter import app_rate_limit
 from config.main import local_configs
+from api.lifespan import lifespan
 from api.second.v1 import router as v1_router
 from api.second.v2 import router as v2_router
-from core.response import Resp
+from core.response import Resp, AesResponse
 from core.exception import handler_roster as exception_handler_roster
 from core.middleware import roster as middleware_roster
 
 second_api = ApiApplication(
     code="Example",
     settings=local_configs,
+    # Resp 直接序列化为 orjson.Fragment 输出
+    default_response_class=AesResponse,
+    dependencies=[Depends(app_rate_limit)],
     title="Example",
     description="Example",
     lifespan=lifespan,
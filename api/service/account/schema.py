@@ -2,7 +2,6 @@ from pydantic import Field, BaseModel, field_validator
 from tortoise.contrib.pydantic import pydantic_model_creator
 
 from core.types import ApiException
-from util.encrypt import PasswordUtil
 from constant.regex import PASSWORD_REGEX
 from ext.ext_tortoise import enums
 from enhance.epydantic import as_query, optional
@@ -14,10 +13,11 @@ class AccountCreate(
     pydantic_model_creator(Account, name="AccountCreate", exclude=("last_login_at", "status"), exclude_readonly=True)
 ):
     @field_validator("password")
-    def encrypt_pwd(cls, v: str) -> str:
+    def check_pwd(cls, v: str) -> str:
+        # 只校验格式, 哈希在接口中异步计算
         if not PASSWORD_REGEX.match(v):
             raise ApiException("密码格式错误")
-        return PasswordUtil.get_password_hash(v)
+        return v
 
 
 @optional()
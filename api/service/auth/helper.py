@@ -6,6 +6,9 @@
 """
 
 import uuid
+import asyncio
+
+from loguru import logger
 
 from core.types import ApiException
 from config.main import local_configs
@@ -13,19 +16,22 @@ from util.encrypt import PasswordUtil
 from ext.ext_redis import keys
 from ext.ext_tortoise import enums
 from ext.ext_redis.helper import verify_captcha_code
+from ext.ext_tortoise.curd import broadcast_invalidation
 from api.service.auth.schema import CodeLoginSchema, PasswordLoginSchema
+from ext.ext_redis.broadcast import InvalidationTopicEnum, invalidation_bus
 from ext.ext_tortoise.models.user_center import Account
 
 
 async def login_cache_redis(account: Account, scene: enums.TokenSceneTypeEnum) -> str:
-    token = uuid.uuid4().hex
+    token = f"{account.id}.{uuid.uuid4().hex}"
     # account_info = AccountRedisInfo.model_validate(account).model_dump()
     perms = await account.get_permission_codes()
     async with local_configs.extensions.redis.instance as r:
+        # 以下 key 都在该账户的 slot 内; cluster 模式下 redis-py 不支持事务 pipeline, 各命令不保证原子执行
         async with r.pipeline() as pipe:
             # 设置 token -> account 映射
             pipe.set(
-                keys.UserCenterKey.Token2AccountKey.format(token=token),
+                keys.token_key(token),
                 value=f"{str(account.id)}:{scene.value}",
                 ex=local_configs.server.token_expire_seconds,
             )
@@ -51,7 +57,11 @@ async def login_cache_redis(account: Account, scene: enums.TokenSceneTypeEnum) -
                     ),
                     *perms,  # type: ignore
                 )
-            await pipe.execute()
+            version_key = keys.UserCenterKey.AccountApiPermissionVersion.format(uuid=str(account.id))  # type: ignore
+            pipe.incr(version_key)
+            pipe.expire(version_key, local_configs.server.local_cache.permission_version_ttl)
+            *_, version, _ = await pipe.execute()
+        await invalidation_bus.publish(r, InvalidationTopicEnum.permission.value, [f"{account.id}:{version}"])
     return token
 
 
@@ -68,7 +78,9 @@ async def logout_cache_redis(account: Account, scene: enums.TokenSceneTypeEnum):
             # 删除 token -> account 映射
             pipe.srem(keys.UserCenterKey.Account2TokenKey.format(account_id=str(account.id), scene=scene), *ks)
             for k in ks:
-                pipe.delete(keys.UserCenterKey.Token2AccountKey.format(token=k))
+                pipe.delete(keys.token_key(k))
+            # 通知所有 worker 清理本地 token 缓存
+            invalidation_bus.publish_in_pipeline(pipe, InvalidationTopicEnum.token.value, ks)
             await pipe.execute()
 
 
@@ -103,10 +115,27 @@ async def password_login(
         raise ApiException(message="用户不存在")
 
     # 密码校验
-    if not account or not PasswordUtil.verify_password(
-        login_data.password,
-        account.password,
-    ):
+    verified, new_hash = await PasswordUtil.averify_and_update(login_data.password, account.password)
+    if not verified:
         raise ApiException(message="用户名或密码错误")
 
+    if new_hash:
+        # 哈希方案/参数已变更, 后台保存新哈希, 不阻塞登录
+        task = asyncio.create_task(upgrade_password_hash(account, new_hash))
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+
     return account
+
+
+# 持有后台任务引用, 避免执行中被回收
+_background_tasks: set[asyncio.Task] = set()
+
+
+async def upgrade_password_hash(account: Account, new_hash: str) -> None:
+    try:
+        # 仅在密码未被并发修改时更新
+        await Account.filter(id=account.id, password=account.password).update(password=new_hash)
+        await broadcast_invalidation(Account, [account.id])
+    except Exception as e:
+        logger.error(f"账户{account.id}密码哈希升级失败: {e}")
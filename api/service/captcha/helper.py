@@ -0,0 +1,158 @@
+"""图片验证码
+
+渲染(噪点、曲线、JPEG 编码)每张需要数十毫秒 CPU, 由后台进程池预先渲染放入本地池,
+接口直接取用; 池为空时在线程池中渲染, 不占用事件循环
+"""
+
+import random
+import asyncio
+import multiprocessing
+from io import BytesIO
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image
+from loguru import logger
+from captcha.image import ImageCaptcha, random_color  # type: ignore
+from starlette.concurrency import run_in_threadpool
+
+from config.main import local_configs
+from util.general import generate_random_string
+
+CAPTCHA_LENGTH = 4
+
+
+class CustomImageCaptcha(ImageCaptcha):
+    def generate_image(self, chars: str) -> Image:  # type: ignore
+        """Generate the image of the given characters.
+
+        :param chars: text to be generated.
+        """
+        background = random_color(238, 255)
+        color = random_color(10, 200, random.randint(220, 255))
+        im = self.create_captcha_image(chars, color, background)
+        self.create_noise_dots(im, color, 1, 20)
+        self.create_noise_curve(im, color)
+        # im = im.filter(ImageFilter.SMOOTH)
+        return im  # type: ignore
+
+
+# 每个进程一个实例, 字体只加载一次
+_image_captcha: CustomImageCaptcha | None = None
+
+
+def render_captcha(code: str) -> bytes:
+    global _image_captcha
+    if _image_captcha is None:
+        _image_captcha = CustomImageCaptcha(height=80, width=180, font_sizes=(60,))
+    data: BytesIO = _image_captcha.generate(chars=code, format="jpeg")
+    return data.getvalue()
+
+
+def render_random_captcha(length: int = CAPTCHA_LENGTH) -> tuple[str, bytes]:
+    code = generate_random_string(length, all_digits=True)
+    return code, render_captcha(code)
+
+
+class CaptchaPool:
+    """预渲染的 (验证码, jpeg) 池, 低于一半容量时后台补充"""
+
+    size: int
+    max_workers: int
+    length: int
+    _items: deque[tuple[str, bytes]]
+    _executor: ProcessPoolExecutor | None
+    _task: asyncio.Task | None
+    _refill: asyncio.Event | None
+    # 统计
+    hits: int
+    misses: int
+
+    def __init__(self, size: int, max_workers: int = 1, length: int = CAPTCHA_LENGTH) -> None:
+        self.size = size
+        self.max_workers = max_workers
+        self.length = length
+        self._items = deque()
+        self._executor = None
+        self._task = None
+        self._refill = None
+        self.hits = 0
+        self.misses = 0
+
+    def start(self) -> None:
+        """由 api.lifespan 在服务启动时调用, 未启动时每次请求在线程池中渲染"""
+        if self.size <= 0 or (self._task and not self._task.done()):
+            return
+        if self._executor is None:
+            # worker 进程中可能已有其他线程, 不使用 fork 启动子进程
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("forkserver"),
+            )
+        self._refill = asyncio.Event()
+        self._task = asyncio.create_task(self._produce())
+
+    async def _produce(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                while len(self._items) < self.size:
+                    batch = min(self.max_workers, self.size - len(self._items))
+                    self._items.extend(
+                        await asyncio.gather(
+                            *(
+                                loop.run_in_executor(self._executor, render_random_captcha, self.length)
+                                for _ in range(batch)
+                            ),
+                        ),
+                    )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"验证码预渲染失败: {e}")
+                await asyncio.sleep(1)
+                continue
+            self._refill.clear()  # type: ignore
+            await self._refill.wait()  # type: ignore
+
+    async def get(self) -> tuple[str, bytes]:
+        try:
+            item = self._items.popleft()
+        except IndexError:
+            self.misses += 1
+            item = await run_in_threadpool(render_random_captcha, self.length)
+        else:
+            self.hits += 1
+        if self._refill and len(self._items) < self.size // 2:
+            self._refill.set()
+        return item
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        self._items.clear()
+
+    @property
+    def stats(self) -> dict[str, int | float]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._items),
+            "maxsize": self.size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+        }
+
+
+captcha_pool = CaptchaPool(
+    size=local_configs.server.captcha.pool_size,
+    max_workers=local_configs.server.captcha.max_workers,
+)
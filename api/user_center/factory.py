@@ -1,8 +1,12 @@
 from typing import Literal
 
-from core.api import ApiApplication, lifespan
+from fastapi import Depends
+
+from core.api import ApiApplication
+from api.limiter import app_rate_limit
 from config.main import local_configs
-from core.response import Resp
+from api.lifespan import lifespan
+from core.response import Resp, AesResponse
 from core.exception import handler_roster as exception_handler_roster
 from core.middleware import roster as middleware_roster
 from api.user_center.v1 import router as v1_router
@@ -11,6 +15,9 @@ from api.user_center.v2 import router as v2_router
 user_center_api = ApiApplication(
     code="UserCenter",
     settings=local_configs,
+    # Resp 直接序列化为 orjson.Fragment 输出
+    default_response_class=AesResponse,
+    dependencies=[Depends(app_rate_limit)],
     title="用户中心",
     description="统一用户管理中心",
     lifespan=lifespan,
@@ -8,6 +8,7 @@ from tortoise.queryset import QuerySet
 
 from api.depend import api_permission_check
 from core.schema import CRUDPager
+from util.encrypt import PasswordUtil
 from core.response import Resp, PageData
 from ext.ext_tortoise.curd import (
     list_view,
@@ -38,7 +39,9 @@ def get_queryset(request: Request) -> QuerySet[Account]:
 
 @router.post("", description=f"创建{Account.Meta.table_description}", summary=f"创建{Account.Meta.table_description}")
 async def create_account(request: Request, schema: AccountCreate) -> Resp:
-    await create_obj(Account, schema.model_dump(exclude_unset=True))
+    data = schema.model_dump(exclude_unset=True)
+    data["password"] = await PasswordUtil.aget_password_hash(data["password"])
+    await create_obj(Account, data)
     return Resp()
 
 
@@ -3,12 +3,13 @@ from datetime import timedelta
 from fastapi import Depends, Request, APIRouter
 
 from api.depend import token_required
+from api.limiter import RateLimiter
 from config.main import local_configs
 from util.encrypt import PasswordUtil
 from core.response import Resp
 from ext.ext_tortoise import enums
 from ext.ext_redis.helper import verify_captcha_code
-from ext.ext_tortoise.curd import obj_prefetch_fields
+from ext.ext_tortoise.curd import obj_prefetch_fields, broadcast_invalidation
 from api.service.auth.helper import (
     code_login,
     password_login,
@@ -32,6 +33,7 @@ router = APIRouter()
     "/login/pwd",
     summary="登录",
     description="登录接口",
+    dependencies=[Depends(RateLimiter(ip="30/60"))],
 )
 async def login_with_pwd(request: Request, login_data: PasswordLoginSchema) -> Resp[LoginResponse]:
     account = await password_login(login_data)
@@ -51,6 +53,7 @@ async def login_with_pwd(request: Request, login_data: PasswordLoginSchema) -> R
     "/login/code",
     summary="登录",
     description="登录接口",
+    dependencies=[Depends(RateLimiter(ip="30/60"))],
 )
 async def login_with_code(request: Request, login_data: CodeLoginSchema) -> Resp[LoginResponse]:
     account = await code_login(login_data)
@@ -116,8 +119,9 @@ async def reset_password(request: Request, schema: ResetPasswordIn) -> Resp:
     ):
         return Resp.fail(message="验证码错误")
 
-    account.password = PasswordUtil.get_password_hash(schema.password)
+    account.password = await PasswordUtil.aget_password_hash(schema.password)
     await account.save(update_fields=["password"])
+    await broadcast_invalidation(Account, [account.id])
 
     return Resp()
 
@@ -132,12 +136,13 @@ async def change_password(
     schema: ChangePasswordIn,
     account: Account = Depends(token_required),
 ) -> Resp:
-    if not PasswordUtil.verify_password(
+    if not await PasswordUtil.averify_password(
         schema.old_password,
         account.password,
     ):
         return Resp.fail(message="旧密码错误")
-    account.password = PasswordUtil.get_password_hash(schema.new_password)
+    account.password = await PasswordUtil.aget_password_hash(schema.new_password)
     await account.save(update_fields=["password"])
+    await broadcast_invalidation(Account, [account.id])
 
     return Resp()
@@ -1,11 +1,8 @@
 import uuid
-import random
 
-from PIL import Image
 from fastapi import Body, Query, APIRouter
 from pydantic import Field, BaseModel
-from captcha.image import ImageCaptcha, random_color  # type: ignore
-from fastapi.responses import StreamingResponse
+from fastapi.responses import Response
 
 from core.types import ApiException
 from core.response import Resp
@@ -13,6 +10,7 @@ from ext.ext_redis import keys
 from constant.regex import EMAIL_REGEX, PHONE_REGEX_CN
 from ext.ext_tortoise import enums
 from ext.ext_redis.helper import generate_captcha_code
+from api.service.captcha.helper import captcha_pool
 from ext.ext_tortoise.models.user_center import Account
 
 router = APIRouter()
@@ -26,28 +24,14 @@ class CaptchaCodeResponse(BaseModel):
     "/captcha/image",
     summary="图片验证码",
     description="图片验证码, unique_key附带在响应头中",
-    response_class=StreamingResponse,
+    response_class=Response,
+    responses={200: {"content": {"image/jpeg": {}}}},
 )
 async def captcha_image(
     scene: enums.SendCodeScene = Query(description="场景"),
-) -> StreamingResponse:
+) -> Response:
     identifier = uuid.uuid4()
 
-    class CustomImageCaptcha(ImageCaptcha):
-        def generate_image(self, chars: str) -> Image:  # type: ignore
-            """Generate the image of the given characters.
-
-            :param chars: text to be generated.
-            """
-            background = random_color(238, 255)
-            color = random_color(10, 200, random.randint(220, 255))
-            im = self.create_captcha_image(chars, color, background)
-            self.create_noise_dots(im, color, 1, 20)
-            self.create_noise_curve(im, color)
-            # im = im.filter(ImageFilter.SMOOTH)
-            return im  # type: ignore
-
-    image = CustomImageCaptcha(height=80, width=180, font_sizes=(60,))
     unique_key = keys.UserCenterKey.CodeUniqueKey.format(  # type: ignore
         scene=scene.value,
         identifier=identifier,
@@ -63,16 +47,18 @@ async def captcha_image(
     #         identifier=account.id,
     #     )
 
-    code = await generate_captcha_code(
+    code, content = await captcha_pool.get()
+    await generate_captcha_code(
         unique_key=unique_key,
-        length=4,
+        length=len(code),
         all_digits=True,
         expire_seconds=1 * 60,
+        code=code,
         # excludes=["o", "0", "l"],
     )
 
-    return StreamingResponse(
-        content=image.generate(chars=code),
+    return Response(
+        content=content,
         media_type="image/jpeg",
         headers={"x-unique-key": unique_key},
     )
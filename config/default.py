@@ -2,13 +2,16 @@ import os
 import abc
 import enum
 import multiprocessing
-from typing import Self, Generic, TypeVar
+from typing import Self, Generic, Literal, TypeVar, Annotated
 from pathlib import Path
 
-from pydantic import HttpUrl, BaseModel, model_validator
+from pydantic import HttpUrl, BaseModel, StringConstraints, model_validator
 
 T = TypeVar("T")
 
+RateLimitDimension = Literal["account", "api_key", "ip"]
+RateLimitRule = Annotated[str, StringConstraints(pattern=r"^[1-9]\d*/[1-9]\d*$")]
+
 
 class EnvironmentEnum(str, enum.Enum):
     local = "local"
@@ -59,8 +62,64 @@ class ServerConfig(BaseModel):
 
             return header
 
+    class LocalCacheConfig(BaseModel):
+        """worker 进程内缓存配置, 失效消息通过 redis 广播到所有 worker"""
+
+        token_maxsize: int = 10000
+        # 本地最长缓存秒数, 也是失效广播丢失时的最大延迟, 0 表示不缓存
+        token_ttl: int = 30
+        account_maxsize: int = 10000
+        # 账户变更会广播失效, 可以设置较长的 TTL
+        account_ttl: int = 3600
+        # redis: 每次请求查询 redis 权限集合; local: 权限集合加载到本地, 按版本号失效
+        permission_mode: Literal["redis", "local"] = "redis"
+        permission_maxsize: int = 10000
+        permission_ttl: int = 600
+
+        @property
+        def permission_version_ttl(self) -> int:
+            """权限版本号 key 的过期秒数, 长于本地缓存, key 过期重置时各 worker 已不再持有旧版本"""
+            return self.permission_ttl * 2
+
+    class PasswordHashConfig(BaseModel):
+        """密码哈希在独立的进程/线程池中计算, 避免阻塞事件循环"""
+
+        # 第一个用于新密码, 其余方案的旧哈希在登录时自动升级
+        schemes: list[str] = ["bcrypt"]
+        # bcrypt 计算成本, 每加 1 耗时翻倍; 调高后旧哈希在登录时自动升级
+        bcrypt_rounds: int = 12
+        # passlib 方案参数, 如 {"argon2__time_cost": 3}, argon2 需要安装 argon2 extra
+        scheme_options: dict[str, int | str] = {}
+        executor: Literal["process", "thread"] = "process"
+        max_workers: int = 2
+
+    class CaptchaConfig(BaseModel):
+        """图片验证码预渲染池, 服务启动时启动"""
+
+        # 0 表示不预渲染, 每次请求在线程池中渲染
+        pool_size: int = 200
+        max_workers: int = 1
+
+    class RateLimitConfig(BaseModel):
+        """接口限流, 规则格式 "次数/秒数"; 维度: account/api_key/ip
+
+        先经 worker 内令牌桶预检, 再由 redis 滑动窗口计数; redis 不可用时放行
+        """
+
+        enabled: bool = True
+        # ApiApplication.code -> {维度: 规则}, 作用于应用下所有接口
+        apps: dict[str, dict[RateLimitDimension, RateLimitRule]] = {}
+        # 接口权限码(code:METHOD:path) -> {维度: 规则}, 覆盖代码中 RateLimiter 声明的同维度规则
+        routes: dict[str, dict[RateLimitDimension, RateLimitRule]] = {}
+        # 本地令牌桶数量上限
+        local_maxsize: int = 100000
+
     address: HttpUrl = HttpUrl("http://0.0.0.0:8000")
     cors: CorsConfig = CorsConfig()
+    local_cache: LocalCacheConfig = LocalCacheConfig()
+    password_hash: PasswordHashConfig = PasswordHashConfig()
+    captcha: CaptchaConfig = CaptchaConfig()
+    rate_limit: RateLimitConfig = RateLimitConfig()
     worker_number: int = multiprocessing.cpu_count() * int(os.getenv("WORKERS_PER_CORE", "2")) + 1
     profiling: ProfilingConfig | None = None
     allow_hosts: list = ["*"]
@@ -3,6 +3,7 @@ from collections.abc import AsyncGenerator
 
 from config.main import local_configs
 from core.logger import LogLevelEnum, setup_loguru
+from util.encrypt import PasswordUtil
 from config.default import RegisterExtensionConfig
 from enhance.monkey_patch import patch
 
@@ -12,6 +13,8 @@ async def init_ctx():
     patch()
     # logger
     setup_loguru(LogLevelEnum.DEBUG if local_configs.project.debug else LogLevelEnum.INFO)
+    # 密码哈希
+    PasswordUtil.configure(**local_configs.server.password_hash.model_dump())
     # extensions
     for _, ext_conf in local_configs.extensions:  # type: ignore
         if isinstance(ext_conf, RegisterExtensionConfig):
@@ -22,6 +25,7 @@ async def clear_ctx():
     for _, ext_conf in local_configs.extensions:  # type: ignore
         if isinstance(ext_conf, RegisterExtensionConfig):
             await ext_conf.unregister()
+    PasswordUtil.shutdown()
 
 
 @asynccontextmanager
@@ -2,7 +2,7 @@ import time
 import uuid
 
 from loguru import logger
-from starlette.types import Message
+from starlette.types import Send, Scope, ASGIApp, Message, Receive
 from starlette_context import context, request_cycle_context
 from starlette.requests import Request, HTTPConnection
 from starlette.responses import Response
@@ -12,7 +12,7 @@ from starlette_context.errors import MiddleWareValidationError
 from starlette.middleware.base import RequestResponseEndpoint
 from starlette.middleware.cors import CORSMiddleware
 from starlette_context.plugins import Plugin
-from starlette_context.middleware import ContextMiddleware
+from starlette_context.middleware import ContextMiddleware, RawContextMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 
 from core.types import ContextKeyEnum, ResponseHeaderKeyEnum
@@ -138,10 +138,46 @@ class ContextMiddlewareWithTraceId(ContextMiddleware):
             return response
 
 
+class ContextPureMiddlewareWithTraceId(RawContextMiddleware):
+    """纯 ASGI 上下文中间件
+
+    不经过 BaseHTTPMiddleware, 没有额外的 task 和内存流, 流式响应逐块透传;
+    插件只在 http.response.start 时 enrich, 每个请求只记录一次日志
+    """
+
+    app: ASGIApp
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            context = await self.set_context(self.get_request_object(scope, receive, send))
+        except MiddleWareValidationError as e:
+            error_response = e.error_response or self.error_response
+            await self.send_response(error_response, send)
+            return
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                for plugin in self.plugins:
+                    await plugin.enrich_response(message)
+            await send(message)
+
+        with (
+            request_cycle_context(context),
+            logger.contextualize(
+                trace_id=context.get(RequestIdPlugin.key),
+            ),
+        ):
+            await self.app(scope, receive, send_wrapper)
+
+
 roster = [
     # >>>>> Middleware Func
     (
-        ContextMiddlewareWithTraceId,
+        ContextPureMiddlewareWithTraceId,
         {
             "plugins": [
                 RequestIdPlugin(),
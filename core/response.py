@@ -125,10 +125,13 @@ class SimpleSuccess(Resp):
 class PageInfo(BaseModel):
     """翻页相关信息."""
 
-    total_page: int
-    total_count: int
+    # 不统计总数时为空, 估算时为近似值
+    total_page: int | None
+    total_count: int | None
     size: int
     page: int
+    # 游标分页时返回, 为空表示没有下一页
+    next_cursor: str | None = None
 
 
 class PageData(BaseModel, Generic[DataT]):
@@ -138,22 +141,28 @@ class PageData(BaseModel, Generic[DataT]):
     def __init__(
         self,
         records: Sequence[DataT],
-        total_count: int,
+        total_count: int | None,
         pager: Pager | CRUDPager,
         page_info: PageInfo | None = None,
+        next_cursor: str | None = None,
     ) -> None:
         if page_info is None:
-            page_info = generate_page_info(total_count, pager)
+            page_info = generate_page_info(total_count, pager, next_cursor)
         super().__init__(
             page_info=page_info,
             records=records,
         )
 
 
-def generate_page_info(total_count: int, pager: Pager | CRUDPager) -> PageInfo:
+def generate_page_info(
+    total_count: int | None,
+    pager: Pager | CRUDPager,
+    next_cursor: str | None = None,
+) -> PageInfo:
     return PageInfo(
-        total_page=ceil(total_count / pager.limit),
+        total_page=ceil(total_count / pager.limit) if total_count is not None else None,
         total_count=total_count,
         size=pager.limit,
         page=pager.offset // pager.limit + 1,
+        next_cursor=next_cursor,
     )
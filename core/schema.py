@@ -1,9 +1,20 @@
+from enum import unique
 from typing import Callable
 
-from fastapi import Body, Query
+from fastapi import Body, Query, Depends
 from pydantic import BaseModel, PositiveInt, conint
 
-from core.types import ApiException
+from core.types import StrEnum, ApiException
+
+
+@unique
+class CountModeEnum(StrEnum):
+    """列表总数统计方式"""
+
+    exact = ("exact", "精确 COUNT")
+    none = ("none", "不统计")
+    cached = ("cached", "精确 COUNT, 按查询条件短时缓存")
+    estimate = ("estimate", "EXPLAIN 估算行数")
 
 
 class Pager(BaseModel):
@@ -17,6 +28,12 @@ class CRUDPager(Pager):
     selected_fields: set[str] | None = None
     available_search_fields: set[str] | None = None
     list_schema: type[BaseModel]
+    # 游标分页, 开启后忽略 offset, 按 cursor 之后的位置取数据
+    cursor_enabled: bool = False
+    cursor: str | None = None
+    count_mode: CountModeEnum = CountModeEnum.exact
+    # CountModeEnum.cached 的缓存秒数
+    count_cache_ttl: PositiveInt = 30
     # available_sort_fields: set[str] | None = None
     # available_search_fields: set[str] | None = None
 
@@ -39,7 +56,18 @@ def paginate(
     list_schema: type[BaseModel],
     max_limit: int | None,
     param_type: type[Query] | type[Body] = Query,  # type: ignore
-) -> Callable[[PositiveInt, PositiveInt, str, set[str], set[str] | None], CRUDPager]:
+    cursor_pagination: bool = False,
+    count_mode: CountModeEnum = CountModeEnum.exact,
+    count_cache_ttl: int = 30,
+) -> Callable[..., CRUDPager]:
+    if cursor_pagination:
+        # 下一页游标从返回数据中读取排序字段与主键的值; NULL 不能参与 > / < 比较, 会漏掉数据
+        for field in {*order_fields, model._meta.pk_attr}:
+            if field not in list_schema.model_fields:
+                raise ValueError(f"cursor pagination requires {list_schema.__name__}.{field}")
+            if model._meta.fields_map[field].null:
+                raise ValueError(f"cursor pagination does not support nullable {field}")
+
     def get_pager(
         page: PositiveInt = param_type(default=1, examples=[1], description="第几页"),
         size: PositiveInt = param_type(default=10, examples=[10], description="每页数量"),
@@ -97,6 +125,28 @@ def paginate(
             selected_fields=selected_fields,
             available_search_fields=search_fields,
             list_schema=list_schema,
+            count_mode=count_mode,
+            count_cache_ttl=count_cache_ttl,
         )
 
-    return get_pager  # type: ignore
+    if not cursor_pagination:
+        return get_pager  # type: ignore
+
+    def get_cursor_pager(
+        pager: CRUDPager = Depends(get_pager),
+        cursor: str | None = param_type(
+            None,
+            description="游标, 取上一页返回的 page_info.next_cursor, 传入时忽略页码",
+        ),
+    ) -> CRUDPager:
+        pager.cursor_enabled = True
+        pager.cursor = cursor
+        if cursor:
+            pager.offset = 0
+        if pager.selected_fields:
+            # 生成下一页游标需要排序字段与主键的值
+            pager.selected_fields.update(i.lstrip("-") for i in pager.order_by)
+            pager.selected_fields.add(model._meta.pk_attr)
+        return pager
+
+    return get_cursor_pager
@@ -0,0 +1,26 @@
+import pytest
+from pydantic import BaseModel
+
+from core.schema import paginate
+from ext.ext_tortoise.models.second import SecondTable1
+
+
+class ListSchema(BaseModel):
+    id: int
+    a: str
+    deleted_at: str | None = None
+
+
+class NoPkSchema(BaseModel):
+    a: str
+
+
+def test_cursor_pagination_fields() -> None:
+    paginate(SecondTable1, set(), {"a"}, ListSchema, None, cursor_pagination=True)
+    # 下一页游标需要从返回数据中读取主键
+    with pytest.raises(ValueError, match="NoPkSchema.id"):
+        paginate(SecondTable1, set(), {"a"}, NoPkSchema, None, cursor_pagination=True)
+    with pytest.raises(ValueError, match="nullable deleted_at"):
+        paginate(SecondTable1, set(), {"deleted_at"}, ListSchema, None, cursor_pagination=True)
+    # 非游标分页不校验
+    paginate(SecondTable1, set(), {"deleted_at"}, NoPkSchema, None)
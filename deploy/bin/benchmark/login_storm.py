@@ -0,0 +1,84 @@
+"""登录风暴下无关接口的延迟对比: 事件循环内 bcrypt vs 进程/线程池
+
+python -m deploy.bin.benchmark.login_storm [并发登录数]
+"""
+
+import sys
+import time
+import asyncio
+import statistics
+
+sys.path.append(".")  # noqa
+
+import httpx
+from fastapi import FastAPI
+from starlette.responses import PlainTextResponse
+
+from util.encrypt import PasswordUtil
+
+PASSWORD = "Passw0rd!"
+
+
+def build_app(mode: str, hashed: str) -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/login")
+    async def login() -> PlainTextResponse:
+        if mode == "inline":
+            ok = PasswordUtil.verify_password(PASSWORD, hashed)
+        else:
+            ok = await PasswordUtil.averify_password(PASSWORD, hashed)
+        assert ok
+        return PlainTextResponse("ok")
+
+    @app.get("/ping")
+    async def ping() -> PlainTextResponse:
+        return PlainTextResponse("pong")
+
+    return app
+
+
+async def storm(app: FastAPI, logins: int) -> tuple[list[float], float]:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        done = asyncio.Event()
+
+        async def probe() -> list[float]:
+            costs = []
+            while not done.is_set():
+                start = time.perf_counter()
+                await client.get("/ping")
+                costs.append((time.perf_counter() - start) * 1e3)
+                await asyncio.sleep(0.005)
+            return costs
+
+        probe_task = asyncio.create_task(probe())
+        start = time.perf_counter()
+        await asyncio.gather(*(client.post("/login") for _ in range(logins)))
+        elapsed = time.perf_counter() - start
+        done.set()
+        return await probe_task, elapsed
+
+
+def p99(costs: list[float]) -> float:
+    # 登录阻塞事件循环时探测次数很少
+    return statistics.quantiles(costs, n=100)[98] if len(costs) >= 100 else max(costs)  # noqa: PLR2004
+
+
+async def main(logins: int) -> None:
+    hashed = PasswordUtil.get_password_hash(PASSWORD)
+    for mode, executor in [("inline", "thread"), ("offload", "thread"), ("offload", "process")]:
+        PasswordUtil.configure(executor=executor, max_workers=2)
+        costs, elapsed = await storm(build_app(mode, hashed), logins)
+        name = mode if mode == "inline" else f"{mode}/{executor}"
+        print(
+            f"{name:<16} logins {logins} in {elapsed:6.2f}s  /ping n={len(costs):<4} "
+            f"p50 {statistics.median(costs):8.1f}ms  p99 {p99(costs):8.1f}ms  max {max(costs):8.1f}ms",
+        )
+        if mode == "offload":
+            print(f"{'':<16} {PasswordUtil.metrics()}")
+        PasswordUtil.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 20))
@@ -0,0 +1,89 @@
+"""上下文中间件单请求开销对比
+
+python -m deploy.bin.benchmark.middleware_overhead [请求数]
+"""
+
+import sys
+import time
+import asyncio
+import statistics
+
+sys.path.append(".")  # noqa
+
+import httpx
+from loguru import logger
+from fastapi import FastAPI
+from starlette.responses import PlainTextResponse, StreamingResponse
+
+from core.middleware import (
+    RequestIdPlugin,
+    RequestProcessInfoPlugin,
+    RequestStartTimestampPlugin,
+    ContextMiddlewareWithTraceId,
+    ContextPureMiddlewareWithTraceId,
+)
+
+
+def build_app(middleware: type | None) -> FastAPI:
+    app = FastAPI()
+    if middleware:
+        app.add_middleware(
+            middleware,  # type: ignore
+            plugins=[RequestIdPlugin(), RequestStartTimestampPlugin(), RequestProcessInfoPlugin()],
+        )
+
+    @app.get("/ping")
+    async def ping() -> PlainTextResponse:
+        return PlainTextResponse("pong")
+
+    @app.get("/stream")
+    async def stream() -> StreamingResponse:
+        async def chunks():  # noqa
+            for _ in range(10):
+                yield b"x" * 1024
+
+        return StreamingResponse(chunks())
+
+    return app
+
+
+async def bench(app: FastAPI, path: str, n: int) -> list[float]:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for _ in range(100):
+            await client.get(path)
+        costs = []
+        for _ in range(n):
+            start = time.perf_counter()
+            resp = await client.get(path)
+            costs.append((time.perf_counter() - start) * 1e6)
+            assert resp.status_code == 200
+    return costs
+
+
+async def main(n: int) -> None:
+    # 保留日志格式化开销, 但不输出
+    logger.remove()
+    logger.add(lambda _: None)
+
+    variants = {
+        "none": None,
+        "BaseHTTPMiddleware": ContextMiddlewareWithTraceId,
+        "pure ASGI": ContextPureMiddlewareWithTraceId,
+    }
+    for path in ["/ping", "/stream"]:
+        baseline = None
+        print(f"{path} x {n}")
+        for name, middleware in variants.items():
+            costs = await bench(build_app(middleware), path, n)
+            mean = statistics.mean(costs)
+            if baseline is None:
+                baseline = mean
+            print(
+                f"  {name:<20} mean {mean:8.1f}us  p50 {statistics.median(costs):8.1f}us  "
+                f"p99 {statistics.quantiles(costs, n=100)[98]:8.1f}us  overhead {mean - baseline:7.1f}us",
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000))
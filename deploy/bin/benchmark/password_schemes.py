@@ -0,0 +1,54 @@
+"""各密码哈希方案的校验吞吐对比, 用于选择 server.password_hash 配置
+
+python -m deploy.bin.benchmark.password_schemes [每个方案校验次数]
+"""
+
+import sys
+import time
+import asyncio
+
+sys.path.append(".")  # noqa
+
+from passlib.exc import MissingBackendError  # type: ignore
+
+from util.encrypt import PasswordUtil
+
+PASSWORD = "Passw0rd!"
+
+CANDIDATES: list[tuple[str, dict]] = [
+    ("bcrypt", {"bcrypt_rounds": 12}),
+    ("bcrypt", {"bcrypt_rounds": 10}),
+    ("argon2", {"scheme_options": {"argon2__time_cost": 3, "argon2__memory_cost": 65536}}),
+    ("argon2", {"scheme_options": {"argon2__time_cost": 2, "argon2__memory_cost": 19456}}),
+    ("pbkdf2_sha256", {"scheme_options": {"pbkdf2_sha256__rounds": 600000}}),
+]
+
+
+async def bench(n: int, workers: int) -> None:
+    for scheme, options in CANDIDATES:
+        PasswordUtil.configure(schemes=[scheme], executor="process", max_workers=workers, **options)
+        try:
+            hashed = PasswordUtil.get_password_hash(PASSWORD)
+        except MissingBackendError:
+            print(f"{scheme:<14} 未安装依赖, 跳过")
+            continue
+        # 预热进程池
+        await asyncio.gather(*(PasswordUtil.averify_password(PASSWORD, hashed) for _ in range(workers)))
+
+        start = time.perf_counter()
+        PasswordUtil.verify_password(PASSWORD, hashed)
+        single = time.perf_counter() - start
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(PasswordUtil.averify_password(PASSWORD, hashed) for _ in range(n)))
+        elapsed = time.perf_counter() - start
+        assert all(results)
+        print(
+            f"{scheme:<14} {str(options):<80} single {single * 1e3:7.1f}ms  "
+            f"{workers} workers {n / elapsed:7.1f} verify/s",
+        )
+        PasswordUtil.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(bench(int(sys.argv[1]) if len(sys.argv) > 1 else 40, 2))
@@ -0,0 +1,89 @@
+"""Resp 序列化耗时对比: model_dump -> jsonable_encoder -> orjson 与 model_dump -> orjson
+
+python -m deploy.bin.benchmark.resp_serialize [记录数] [轮数]
+"""
+
+import sys
+import time
+import asyncio
+import statistics
+from datetime import datetime, timedelta
+
+sys.path.append(".")  # noqa
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from starlette_context import request_cycle_context
+
+from core.schema import Pager
+from core.response import Resp, PageData, AesResponse
+from ext.ext_tortoise import enums
+from enhance.monkey_patch import _fragment_response, serialize_response
+from api.service.account.schema import AccountList
+
+
+def build_resp(n: int) -> Resp:
+    now = datetime.now()
+    records = [
+        AccountList(
+            id=i,
+            created_at=now - timedelta(days=i),
+            updated_at=now,
+            deleted_at=None,
+            username=f"user{i}",
+            phone=f"138{i:08d}",
+            email=f"user{i}@example.com",
+            is_staff=i % 2 == 0,
+            is_super_admin=False,
+            status=enums.StatusEnum.enable,
+            last_login_at=now,
+            remark="备注" * 5,
+        )
+        for i in range(n)
+    ]
+    return Resp(data=PageData(records=records, total_count=n, pager=Pager(limit=n, offset=0)))
+
+
+def legacy(resp: Resp) -> bytes:
+    value = resp.model_dump(by_alias=True)
+    value = jsonable_encoder(
+        value,
+        by_alias=True,
+        custom_encoder=resp.model_config.get("json_encoders"),  # type: ignore
+    )
+    return AesResponse(value).body
+
+
+async def fast(resp: Resp) -> bytes:
+    return AesResponse(await serialize_response(response_content=resp)).body
+
+
+async def main(n: int, rounds: int) -> None:
+    # 与 AesResponse 路由一致, 走 Fragment 路径
+    _fragment_response.set(True)
+    with request_cycle_context({}):
+        resp = build_resp(n)
+        old, new = legacy(resp), await fast(resp)
+        assert orjson.loads(old) == orjson.loads(new), "序列化结果不一致"
+
+        old_costs, new_costs = [], []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            legacy(resp)
+            old_costs.append((time.perf_counter() - start) * 1000)
+            start = time.perf_counter()
+            await fast(resp)
+            new_costs.append((time.perf_counter() - start) * 1000)
+
+    print(f"PageData[AccountList] x {n}, {rounds} rounds, {len(new)} bytes")
+    for name, costs in [("legacy", old_costs), ("fast path", new_costs)]:
+        print(f"  {name:<10} mean {statistics.mean(costs):7.2f}ms  p50 {statistics.median(costs):7.2f}ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(
+        main(
+            int(sys.argv[1]) if len(sys.argv) > 1 else 1000,
+            int(sys.argv[2]) if len(sys.argv) > 2 else 100,
+        ),
+    )
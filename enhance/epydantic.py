@@ -1,13 +1,19 @@
 import inspect
 from typing import Literal, Callable
+from functools import lru_cache
+from collections.abc import Iterable
 
 import pydantic
 from fastapi import Body, Form, Query
 from pydantic import BaseModel
 from fastapi.params import _Unset
+from tortoise.contrib.pydantic.base import PydanticModel
 
 from util.general import filter_dict
 
+# 子集模型缓存数量, 每个 (模型, 字段组合) 占一个
+SUB_FIELDS_MODEL_CACHE_SIZE = 512
+
 
 def optional(*fields: str) -> Callable[[type[pydantic.BaseModel]], type[pydantic.BaseModel]]:
     def dec(cls: type[pydantic.BaseModel]) -> type[pydantic.BaseModel]:
@@ -28,6 +34,27 @@ def optional(*fields: str) -> Callable[[type[pydantic.BaseModel]], type[pydantic
 def create_sub_fields_model(
     base_model: type[BaseModel],
     fields: set[str],
+) -> type[BaseModel]:
+    """构建只包含指定字段的子集模型, 相同字段组合复用已构建的模型"""
+    # 忽略不存在的字段, 避免无效字段组合占用缓存
+    return _create_sub_fields_model(base_model, frozenset(fields).intersection(base_model.model_fields))
+
+
+def sub_fields_model_cache_info() -> tuple[int, int, int | None, int]:
+    """子集模型缓存命中统计: (hits, misses, maxsize, currsize)"""
+    return _create_sub_fields_model.cache_info()
+
+
+def prewarm_sub_fields_models(base_model: type[BaseModel], fields_list: Iterable[set[str]]) -> None:
+    """启动时预先构建常用字段组合"""
+    for fields in fields_list:
+        create_sub_fields_model(base_model, fields)
+
+
+@lru_cache(maxsize=SUB_FIELDS_MODEL_CACHE_SIZE)
+def _create_sub_fields_model(
+    base_model: type[BaseModel],
+    fields: frozenset[str],
 ) -> type[BaseModel]:
     model_fields = {}
 
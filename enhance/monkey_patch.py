@@ -1,16 +1,24 @@
 from typing import Any
+from inspect import isclass
+from functools import partial
+from contextvars import ContextVar
+from collections.abc import Callable
 
+import orjson
 from fastapi import routing
 from pydantic import ValidationError
 from fastapi.types import IncEx
 from fastapi._compat import ModelField, _normalize_errors, _regenerate_error_with_loc
 from fastapi.routing import _prepare_response_content
+from starlette.types import Send, Scope, Receive
 from fastapi.encoders import jsonable_encoder
+from fastapi.responses import ORJSONResponse
 from fastapi.exceptions import ResponseValidationError
 from pymysql.converters import escape_item, escape_bytes_prefixed
 from aiomysql.connection import Connection
 from tortoise.expressions import RawSQL
 from starlette.concurrency import run_in_threadpool
+from fastapi.datastructures import DefaultPlaceholder
 
 from core.response import Resp
 
@@ -61,6 +69,31 @@ def escape(self: Connection, obj: Any) -> Any:
     return escape_item(obj, self._charset)
 
 
+# 当前路由的响应类能否直接输出 orjson.Fragment(ORJSONResponse 系, 如 AesResponse), 由 APIRoute.handle 设置
+_fragment_response: ContextVar[bool] = ContextVar("fragment_response", default=False)
+
+_api_route_handle = routing.APIRoute.handle
+
+
+async def api_route_handle(self: routing.APIRoute, scope: Scope, receive: Receive, send: Send) -> None:
+    response_class = self.response_class
+    if isinstance(response_class, DefaultPlaceholder):
+        response_class = response_class.value
+    token = _fragment_response.set(isclass(response_class) and issubclass(response_class, ORJSONResponse))
+    try:
+        await _api_route_handle(self, scope, receive, send)
+    finally:
+        _fragment_response.reset(token)
+
+
+def _orjson_default(obj: Any, encoders: dict[type, Callable[[Any], Any]]) -> Any:
+    # orjson 不支持或需自定义格式的类型, 如 datetime(PASSTHROUGH) / Decimal
+    for type_, encoder in encoders.items():
+        if isinstance(obj, type_):
+            return encoder(obj)
+    return jsonable_encoder(obj, custom_encoder=encoders)
+
+
 async def serialize_response(
     *,
     field: ModelField | None = None,
@@ -83,15 +116,27 @@ async def serialize_response(
             exclude_defaults=exclude_defaults,
             exclude_none=exclude_none,
         )
-        return jsonable_encoder(
-            value,
-            include=include,
-            exclude=exclude,
-            by_alias=by_alias,
-            exclude_unset=exclude_unset,
-            exclude_defaults=exclude_defaults,
-            exclude_none=exclude_none,
-            custom_encoder=response_content.model_config.get("json_encoders"),  # type: ignore
+        if not _fragment_response.get():
+            return jsonable_encoder(
+                value,
+                include=include,
+                exclude=exclude,
+                by_alias=by_alias,
+                exclude_unset=exclude_unset,
+                exclude_defaults=exclude_defaults,
+                exclude_none=exclude_none,
+                custom_encoder=response_content.model_config.get("json_encoders"),  # type: ignore
+            )
+        # model_dump 后直接 orjson 序列化, 响应类原样输出 Fragment
+        return orjson.Fragment(
+            orjson.dumps(
+                value,
+                default=partial(
+                    _orjson_default,
+                    encoders=response_content.model_config.get("json_encoders") or {},
+                ),
+                option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_PASSTHROUGH_DATETIME,
+            ),
         )
 
     if field:
@@ -143,3 +188,4 @@ def patch() -> None:
     ModelField.validate = validate  # type: ignore
     Connection.escape = escape  # type: ignore
     routing.serialize_response = serialize_response  # type: ignore
+    routing.APIRoute.handle = api_route_handle  # type: ignore
@@ -1,10 +1,11 @@
 from typing import Type, Literal, override
+from functools import cached_property
 
-from config.default import InstanceExtensionConfig
-from ext.ext_oss.provider.base import OssBase
+from config.default import InstanceExtensionConfig, RegisterExtensionConfig
+from ext.ext_oss.provider.base import OssBase, AsyncOssBase
 
 
-class OssConfig(InstanceExtensionConfig[OssBase]):
+class OssConfig(RegisterExtensionConfig, InstanceExtensionConfig[OssBase]):
     provider: Literal["aliyun", "huaweiyun", "minio"] = "aliyun"
     access_key_id: str
     access_key_secret: str
@@ -13,6 +14,9 @@ class OssConfig(InstanceExtensionConfig[OssBase]):
     cname: bool = False
     bucket_name: str
     expire_time: int = 3600 * 24 * 30  # 30天
+    # async_instance 独占线程池大小及并发上限(默认与线程数相同)
+    max_workers: int = 16
+    max_concurrency: int | None = None
 
     @property
     @override
@@ -44,3 +48,21 @@ class OssConfig(InstanceExtensionConfig[OssBase]):
             cname=self.cname,
             expire_time=self.expire_time,
         )
+
+    @cached_property
+    def async_instance(self) -> AsyncOssBase:
+        return AsyncOssBase(
+            self.instance,
+            max_workers=self.max_workers,
+            max_concurrency=self.max_concurrency,
+        )
+
+    @override
+    async def register(self) -> None:
+        return
+
+    @override
+    async def unregister(self) -> None:
+        if "async_instance" in self.__dict__:
+            self.async_instance.shutdown()
+            del self.__dict__["async_instance"]
@@ -7,7 +7,12 @@ import oss2
 from oss2.exceptions import AccessDenied, NoSuchBucket
 
 from util.decorator import singleton
-from ext.ext_oss.provider.base import OssBase, clean_path, normalize_url
+from ext.ext_oss.provider.base import (
+    DEFAULT_FULL_PATH_EXPIRES,
+    OssBase,
+    clean_path,
+    normalize_url,
+)
 
 
 class BucketOperationMixin:
@@ -346,7 +351,7 @@ class AliyunOss(
         expires: int | None = None,
     ) -> tuple[bool, str]:
         if expires is None:
-            expires = 10 * 60
+            expires = DEFAULT_FULL_PATH_EXPIRES
         return self.get_download_url(  # type: ignore
             filepath=filepath,
             base_path="/",
@@ -355,3 +360,39 @@ class AliyunOss(
 
     def list_keys(self, prefix: str, max_keys: int = 1000) -> list[str]:
         return [i.key for i in self.bucket.list_objects(prefix=prefix, max_keys=max_keys).object_list]  # type: ignore
+
+    def init_multipart_upload(
+        self,
+        filepath: str,
+        base_path: str | None = None,
+        headers: dict | oss2.CaseInsensitiveDict | None = None,  # type: ignore
+    ) -> tuple[str, str]:
+        key = self.get_real_path(filepath, base_path)
+        return key, self.bucket.init_multipart_upload(key, headers=headers).upload_id  # type: ignore
+
+    def upload_part(self, key: str, upload_id: str, part_number: int, data: bytes) -> oss2.models.PartInfo:
+        result = self.bucket.upload_part(key, upload_id, part_number, data)  # type: ignore
+        return oss2.models.PartInfo(part_number, result.etag, size=len(data))
+
+    def complete_multipart_upload(self, key: str, upload_id: str, parts: list[oss2.models.PartInfo]) -> str:
+        response = self.bucket.complete_multipart_upload(key, upload_id, parts)  # type: ignore
+        # 请求地址带 ?uploadId=..., 去掉查询参数即为文件地址, 与 create_file 返回一致
+        return response.resp.response.url.split("?", 1)[0]  # type: ignore
+
+    def abort_multipart_upload(self, key: str, upload_id: str) -> None:
+        self.bucket.abort_multipart_upload(key, upload_id)  # type: ignore
+
+    def get_file_size(self, filepath: str, base_path: str | None = None) -> int:
+        return self.get_file_header(filepath, base_path).content_length  # type: ignore
+
+    def get_object_stream(
+        self,
+        filepath: str,
+        start: int | None = None,
+        end: int | None = None,
+        base_path: str | None = None,
+    ) -> oss2.models.GetObjectResult:
+        key = self.get_real_path(filepath, base_path)
+        # oss2 把 (None, end) 解释为最后 end 个字节, 缺省起点按 0 处理以保持闭区间语义
+        byte_range = None if start is None and end is None else (start or 0, end)
+        return self.bucket.get_object(key, byte_range=byte_range)  # type: ignore
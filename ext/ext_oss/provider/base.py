@@ -1,12 +1,47 @@
 import abc
 import time
 import random
+import asyncio
 import posixpath
+import threading
+from typing import Any, TypeVar, Protocol
+from functools import partial
+from collections.abc import Callable, Iterable, AsyncIterable, AsyncIterator
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from cachetools import TLRUCache
 
 from util.general import generate_random_string
 
+R = TypeVar("R")
+
+# get_full_path 未指定有效期时的默认值
+DEFAULT_FULL_PATH_EXPIRES = 10 * 60
+# 签名 url 缓存数量
+SIGNED_URL_CACHE_SIZE = 10000
+# 分片上传的分片大小, 单个传输的内存占用约为 分片大小 * (并发数 + 1)
+DEFAULT_PART_SIZE = 8 * 1024 * 1024
+# 流式下载每次读取的大小
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+
+class ObjectStream(Protocol):
+    """provider 返回的对象内容流"""
+
+    def read(self, amt: int | None = None) -> bytes: ...
+
+    def close(self) -> None: ...
+
+
+def signed_url_ttu(key: tuple[str, int | None], value: tuple[bool, str], now: float) -> float:
+    """签名 url 在过期前(最多提前 60s)淘汰, 避免返回即将过期的链接"""
+    expires = key[1] or DEFAULT_FULL_PATH_EXPIRES
+    return now + expires - min(60, expires // 10)
+
 
 class OssBase(abc.ABC):
+    _signed_url_cache: TLRUCache
+    _signed_url_lock: threading.Lock
 
     @abc.abstractmethod
     def __init__(
@@ -121,10 +156,395 @@ class OssBase(abc.ABC):
     ) -> tuple[bool, str]:
         raise NotImplementedError
 
+    def get_full_paths(
+        self,
+        filepaths: Iterable[str],
+        expires: int | None = None,
+    ) -> dict[str, tuple[bool, str]]:
+        """批量获取访问 url, 签名结果按 (key, 有效期) 缓存"""
+        # 子类不调用 super().__init__, 首次使用时创建
+        if "_signed_url_cache" not in self.__dict__:
+            self._signed_url_cache = TLRUCache(maxsize=SIGNED_URL_CACHE_SIZE, ttu=signed_url_ttu)
+            self._signed_url_lock = threading.Lock()
+
+        result = {}
+        for filepath in filepaths:
+            with self._signed_url_lock:
+                signed = self._signed_url_cache.get((filepath, expires))
+            if signed is None:
+                signed = self.get_full_path(filepath, expires)
+                if signed[0]:
+                    with self._signed_url_lock:
+                        self._signed_url_cache[(filepath, expires)] = signed
+            result[filepath] = signed
+        return result
+
     @abc.abstractmethod
     def list_keys(self, prefix: str, max_keys: int = 1000) -> list[str]:
         raise NotImplementedError
 
+    # 分片上传 / 范围下载, 未实现的 provider 不支持流式传输
+    def init_multipart_upload(
+        self,
+        filepath: str,
+        base_path: str | None = None,
+        headers: dict | None = None,
+    ) -> tuple[str, str]:
+        """初始化分片上传, 返回 (key, upload_id)"""
+        raise NotImplementedError
+
+    def upload_part(self, key: str, upload_id: str, part_number: int, data: bytes) -> Any:  # ruff: noqa: ANN401
+        """上传分片, part_number 从 1 开始, 返回 complete_multipart_upload 所需的分片信息"""
+        raise NotImplementedError
+
+    def complete_multipart_upload(self, key: str, upload_id: str, parts: list) -> str:
+        """完成分片上传, 返回 url"""
+        raise NotImplementedError
+
+    def abort_multipart_upload(self, key: str, upload_id: str) -> None:
+        raise NotImplementedError
+
+    def get_file_size(self, filepath: str, base_path: str | None = None) -> int:
+        raise NotImplementedError
+
+    def get_object_stream(
+        self,
+        filepath: str,
+        start: int | None = None,
+        end: int | None = None,
+        base_path: str | None = None,
+    ) -> ObjectStream:
+        """获取对象内容流, [start, end] 为闭区间字节范围"""
+        raise NotImplementedError
+
+
+class AsyncOssBase:
+    """OssBase 的异步接口
+
+    sdk 调用在 provider 独占的有界线程池中执行, 不占用 anyio 默认线程池(set_threadpool_tokens),
+    超出并发上限的调用在事件循环中排队等待, 不堆积到线程池队列
+    """
+
+    oss: OssBase
+    max_concurrency: int
+    _executor: ThreadPoolExecutor
+    _semaphore: asyncio.Semaphore
+
+    # 指标
+    queued: int  # 等待执行
+    running: int  # 执行中
+    completed: int
+    failed: int
+    total_wait_time: float  # 累计排队秒数
+    max_wait_time: float
+
+    def __init__(self, oss: OssBase, max_workers: int, max_concurrency: int | None = None) -> None:
+        self.oss = oss
+        self.max_concurrency = min(max_concurrency or max_workers, max_workers)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"oss-{type(oss).__name__}")
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self.queued = self.running = self.completed = self.failed = 0
+        self.total_wait_time = self.max_wait_time = 0.0
+
+    async def run(self, func: Callable[..., R], *args: Any, **kwargs: Any) -> R:  # ruff: noqa: ANN401
+        """在 oss 线程池中执行同步调用"""
+        self.queued += 1
+        start = time.perf_counter()
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.queued -= 1
+        wait_time = time.perf_counter() - start
+        self.total_wait_time += wait_time
+        self.max_wait_time = max(self.max_wait_time, wait_time)
+
+        self.running += 1
+        loop = asyncio.get_running_loop()
+        try:
+            future = self._executor.submit(func, *args, **kwargs)
+        except BaseException:
+            self._finish(None)
+            raise
+        # 调用方被取消时线程仍在执行, 在线程结束时才归还并发名额
+        future.add_done_callback(partial(self._on_done, loop))
+        return await asyncio.wrap_future(future)
+
+    def _on_done(self, loop: asyncio.AbstractEventLoop, future: Future) -> None:
+        # 线程池线程中调用; 事件循环已关闭时无需归还
+        try:
+            loop.call_soon_threadsafe(self._finish, future)
+        except RuntimeError:
+            pass
+
+    def _finish(self, future: Future | None) -> None:
+        self.running -= 1
+        if future is None or future.cancelled() or future.exception() is not None:
+            self.failed += 1
+        else:
+            self.completed += 1
+        self._semaphore.release()
+
+    @property
+    def metrics(self) -> dict[str, int | float]:
+        finished = self.completed + self.failed
+        return {
+            "max_concurrency": self.max_concurrency,
+            "queued": self.queued,
+            "running": self.running,
+            "completed": self.completed,
+            "failed": self.failed,
+            "avg_wait_time": self.total_wait_time / finished if finished else 0.0,
+            "max_wait_time": self.max_wait_time,
+        }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    # 各 provider 的公共参数, 按关键字传递; provider 特有参数(如 metadata/slash_safe)通过 extra 传递
+
+    async def create_file(
+        self,
+        filepath: str,
+        content: bytes | str,
+        base_path: str | None = None,
+        headers: dict | None = None,
+        progress_callback: Callable | None = None,
+        **extra: Any,
+    ) -> tuple[bool, str]:
+        """内容上传创建文件"""
+        return await self.run(
+            self.oss.create_file,
+            filepath=filepath,
+            content=content,
+            base_path=base_path,
+            headers=headers,
+            progress_callback=progress_callback,
+            **extra,
+        )
+
+    async def create_file_from_local(
+        self,
+        filepath: str,
+        target_path: str,
+        base_path: str | None = None,
+        headers: dict | None = None,
+        progress_callback: Callable | None = None,
+        **extra: Any,
+    ) -> tuple[bool, str]:
+        """上传本地文件"""
+        return await self.run(
+            self.oss.create_file_from_local,
+            filepath=filepath,
+            target_path=target_path,
+            base_path=base_path,
+            headers=headers,
+            progress_callback=progress_callback,
+            **extra,
+        )
+
+    async def exists(self, filepath: str, base_path: str | None = None) -> bool:
+        return await self.run(self.oss.exists, filepath=filepath, base_path=base_path)
+
+    async def delete_file(self, filepath: str, base_path: str | None = None, **extra: Any) -> tuple[bool, str]:
+        """删除文件"""
+        return await self.run(self.oss.delete_file, filepath=filepath, base_path=base_path, **extra)
+
+    async def download_file(
+        self,
+        filepath: str,
+        base_path: str | None = None,
+        target_path: str | None = None,
+        **extra: Any,
+    ) -> tuple[bool, str]:
+        return await self.run(
+            self.oss.download_file,
+            filepath=filepath,
+            base_path=base_path,
+            target_path=target_path,
+            **extra,
+        )
+
+    async def get_file_object(
+        self,
+        filepath: str,
+        base_path: str | None = None,
+        **extra: Any,
+    ) -> tuple[bool, bytes | str]:
+        return await self.run(self.oss.get_file_object, filepath=filepath, base_path=base_path, **extra)
+
+    async def get_download_url(
+        self,
+        filepath: str,
+        expires: int = 10 * 60,
+        headers: dict | None = None,
+        params: dict | None = None,
+        base_path: str | None = None,
+        **extra: Any,
+    ) -> tuple[bool, str] | tuple[bool, tuple[str, dict] | str]:
+        """获取下载url"""
+        return await self.run(
+            self.oss.get_download_url,
+            filepath=filepath,
+            expires=expires,
+            headers=headers,
+            params=params,
+            base_path=base_path,
+            **extra,
+        )
+
+    async def get_perm_download_url(
+        self,
+        filepath: str,
+        base_path: str | None = None,
+        **extra: Any,
+    ) -> tuple[bool, str] | tuple[bool, tuple[str, dict] | str]:
+        return await self.run(self.oss.get_perm_download_url, filepath=filepath, base_path=base_path, **extra)
+
+    async def get_upload_url(
+        self,
+        filepath: str,
+        expires: int = 2 * 60,
+        headers: dict | None = None,
+        params: dict | None = None,
+        base_path: str | None = None,
+        **extra: Any,
+    ) -> tuple[bool, str] | tuple[bool, tuple[str, dict] | str]:
+        """获取上传url"""
+        return await self.run(
+            self.oss.get_upload_url,
+            filepath=filepath,
+            expires=expires,
+            headers=headers,
+            params=params,
+            base_path=base_path,
+            **extra,
+        )
+
+    async def get_full_path(self, filepath: str, expires: int | None = None) -> tuple[bool, str]:
+        return await self.run(self.oss.get_full_path, filepath, expires)
+
+    async def get_full_paths(
+        self, filepaths: Iterable[str], expires: int | None = None
+    ) -> dict[str, tuple[bool, str]]:
+        return await self.run(self.oss.get_full_paths, filepaths, expires)
+
+    async def list_keys(self, prefix: str, max_keys: int = 1000) -> list[str]:
+        return await self.run(self.oss.list_keys, prefix, max_keys)
+
+    async def get_file_size(self, filepath: str, base_path: str | None = None) -> int:
+        return await self.run(self.oss.get_file_size, filepath, base_path)
+
+    async def upload_stream(
+        self,
+        filepath: str,
+        chunks: AsyncIterable[bytes],
+        part_size: int = DEFAULT_PART_SIZE,
+        concurrency: int = 4,
+        base_path: str | None = None,
+        headers: dict | None = None,
+    ) -> tuple[bool, str]:
+        """流式分片上传, 最多 concurrency 个分片并行上传
+
+        Args:
+            filepath (str): oss文件路径
+            chunks (AsyncIterable[bytes]): 文件内容, 如 request.stream() 或 aiter_reader(upload_file)
+            part_size (int): 分片大小, 不足一个分片时直接上传
+            concurrency (int): 并行上传的分片数
+
+        Returns:
+            tuple[bool, str]: 成功标识, url
+        """
+        buffer = bytearray()
+        key = upload_id = None
+        parts: dict[int, Any] = {}
+        tasks: list[asyncio.Task] = []
+        slots = asyncio.Semaphore(concurrency)
+        # 已失败分片的异常, 读取过程中发现即中止, 不再读完剩余输入
+        failures: list[Exception] = []
+
+        async def upload_part(part_number: int, data: bytes) -> None:
+            try:
+                parts[part_number] = await self.run(self.oss.upload_part, key, upload_id, part_number, data)
+            except Exception as e:
+                failures.append(e)
+                raise
+            finally:
+                slots.release()
+
+        async def abort() -> None:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if upload_id is not None:
+                try:
+                    await self.run(self.oss.abort_multipart_upload, key, upload_id)
+                except Exception:  # noqa: S110
+                    pass
+
+        try:
+            async for chunk in chunks:
+                if failures:
+                    raise failures[0]
+                buffer += chunk
+                while len(buffer) >= part_size:
+                    if upload_id is None:
+                        key, upload_id = await self.run(self.oss.init_multipart_upload, filepath, base_path, headers)
+                    # 等待空闲的上传槽位, 限制缓冲在内存中的分片数
+                    await slots.acquire()
+                    if failures:
+                        slots.release()
+                        raise failures[0]
+                    data = bytes(buffer[:part_size])
+                    del buffer[:part_size]
+                    tasks.append(asyncio.create_task(upload_part(len(tasks) + 1, data)))
+
+            if upload_id is None:
+                return await self.create_file(filepath, bytes(buffer), base_path=base_path, headers=headers)
+
+            if buffer:
+                await slots.acquire()
+                tasks.append(asyncio.create_task(upload_part(len(tasks) + 1, bytes(buffer))))
+                buffer.clear()
+            await asyncio.gather(*tasks)
+            url = await self.run(
+                self.oss.complete_multipart_upload,
+                key,
+                upload_id,
+                [parts[i] for i in sorted(parts)],
+            )
+            return True, url
+        except Exception as e:
+            await abort()
+            return False, f"Upload Stream To Oss Failed! Error:{e}"
+        except BaseException:
+            # 客户端断开/任务取消时同样中止分片上传, 避免残留的分片持续占用存储; 再次取消也不打断清理
+            await asyncio.shield(abort())
+            raise
+
+    async def iter_file(
+        self,
+        filepath: str,
+        start: int | None = None,
+        end: int | None = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        base_path: str | None = None,
+    ) -> AsyncIterator[bytes]:
+        """按块流式读取文件, [start, end] 为闭区间字节范围, 可直接交给 StreamingResponse"""
+        stream = await self.run(self.oss.get_object_stream, filepath, start, end, base_path)
+        try:
+            while chunk := await self.run(stream.read, chunk_size):
+                yield chunk
+        finally:
+            await self.run(stream.close)
+
+
+async def aiter_reader(
+    reader: Any, chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> AsyncIterator[bytes]:  # ruff: noqa: ANN401
+    """将带有 async read(size) 的对象(如 UploadFile)转换为异步字节迭代器"""
+    while chunk := await reader.read(chunk_size):
+        yield chunk
+
 
 def normalize_url(url: str) -> str:
     if not url.startswith("http://") and not url.startswith(
@@ -0,0 +1,74 @@
+import time
+import asyncio
+from collections.abc import AsyncIterator
+
+import pytest
+
+from ext.ext_oss.provider.base import AsyncOssBase
+
+
+class FakeOss:
+    """同步 oss 客户端, fail_part 分片上传失败"""
+
+    def __init__(self, fail_part: int | None = None) -> None:
+        self.fail_part = fail_part
+        self.parts: list[int] = []
+        self.aborted = False
+        self.completed = False
+
+    def init_multipart_upload(self, filepath: str, base_path: str | None, headers: dict | None) -> tuple[str, str]:
+        return filepath, "upload-id"
+
+    def upload_part(self, key: str, upload_id: str, part_number: int, data: bytes) -> int:
+        if part_number == self.fail_part:
+            raise RuntimeError("boom")
+        time.sleep(0.01)
+        self.parts.append(part_number)
+        return part_number
+
+    def complete_multipart_upload(self, key: str, upload_id: str, parts: list[int]) -> str:
+        self.completed = True
+        return f"https://oss/{key}"
+
+    def abort_multipart_upload(self, key: str, upload_id: str) -> None:
+        self.aborted = True
+
+
+async def _chunks(count: int, delay: float = 0) -> AsyncIterator[bytes]:
+    for _ in range(count):
+        await asyncio.sleep(delay)
+        yield b"x" * 10
+
+
+@pytest.mark.asyncio
+async def test_upload_stream() -> None:
+    oss = FakeOss()
+    result = await AsyncOssBase(oss, 4).upload_stream("f", _chunks(5), part_size=10, concurrency=2)
+    assert result == (True, "https://oss/f")
+    assert sorted(oss.parts) == [1, 2, 3, 4, 5]
+    assert not oss.aborted
+
+
+@pytest.mark.asyncio
+async def test_upload_stream_part_failed() -> None:
+    oss = FakeOss(fail_part=2)
+    success, message = await AsyncOssBase(oss, 4).upload_stream("f", _chunks(100, 0.001), part_size=10, concurrency=2)
+    assert not success
+    assert "boom" in message
+    assert oss.aborted
+    assert not oss.completed
+
+
+@pytest.mark.asyncio
+async def test_upload_stream_cancelled() -> None:
+    oss = FakeOss()
+    task = asyncio.ensure_future(
+        AsyncOssBase(oss, 4).upload_stream("f", _chunks(100, 0.001), part_size=10, concurrency=2),
+    )
+    await asyncio.sleep(0.03)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    # 取消时中止分片上传
+    assert oss.aborted
+    assert not oss.completed
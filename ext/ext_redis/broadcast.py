@@ -0,0 +1,124 @@
+"""本地缓存失效广播
+
+每个 worker 订阅同一个频道, 任一 worker 发布的失效消息会清理所有 worker 的进程内缓存.
+订阅断开期间的消息可能丢失, 所以(重新)订阅成功后会清空全部本地缓存,
+本地缓存自身的 TTL 即为最坏情况下的失效延迟.
+"""
+
+import asyncio
+from enum import unique
+from collections import defaultdict
+from collections.abc import Callable, Iterable
+
+import orjson
+from loguru import logger
+from redis.asyncio import Redis
+from redis.asyncio.client import Pipeline
+
+from core.types import StrEnum
+from ext.ext_redis.keys import GeneralCacheKey
+
+
+@unique
+class InvalidationTopicEnum(StrEnum):
+    """失效消息主题"""
+
+    token = ("token", "token -> account 映射")
+    account = ("account", "账户信息")
+    permission = ("permission", "账户接口权限, key 为 account_id:version")
+
+
+# keys 为 None 表示清空该主题下的全部缓存
+InvalidationHandler = Callable[[list[str] | None], None]
+
+
+class InvalidationBus:
+    channel: str
+    ping_interval: float
+    _handlers: dict[str, list[InvalidationHandler]]
+    _task: asyncio.Task | None
+
+    def __init__(self, channel: str, ping_interval: float = 10) -> None:
+        self.channel = channel
+        self.ping_interval = ping_interval
+        self._handlers = defaultdict(list)
+        self._task = None
+
+    def subscribe(self, topic: str, handler: InvalidationHandler) -> None:
+        self._handlers[topic].append(handler)
+
+    def dispatch(self, topic: str, keys: list[str] | None) -> None:
+        for handler in self._handlers.get(topic, []):
+            try:
+                handler(keys)
+            except Exception as e:
+                logger.error(f"本地缓存失效处理失败: {topic}, {e}")
+
+    def clear_all(self) -> None:
+        for topic in list(self._handlers):
+            self.dispatch(topic, None)
+
+    def _message(self, topic: str, keys: Iterable[str] | None) -> tuple[bytes, list[str] | None]:
+        key_list = None if keys is None else [str(k) for k in keys]
+        return orjson.dumps({"topic": topic, "keys": key_list}), key_list
+
+    def publish_in_pipeline(self, pipe: Pipeline, topic: str, keys: Iterable[str] | None) -> None:
+        """追加到 pipeline 中发布, 本 worker 立即生效"""
+        message, key_list = self._message(topic, keys)
+        pipe.publish(self.channel, message)
+        self.dispatch(topic, key_list)
+
+    async def publish(self, r: Redis, topic: str, keys: Iterable[str] | None) -> None:
+        message, key_list = self._message(topic, keys)
+        self.dispatch(topic, key_list)
+        await r.publish(self.channel, message)
+
+    def _on_message(self, message: dict) -> None:
+        try:
+            data = orjson.loads(message["data"])
+        except orjson.JSONDecodeError:
+            logger.warning(f"无法解析的失效消息: {message['data']}")
+            return
+        self.dispatch(data["topic"], data["keys"])
+
+    async def _listen(self, client_factory: Callable[[], Redis]) -> None:
+        while True:
+            r = client_factory()
+            try:
+                async with r.pubsub(ignore_subscribe_messages=True) as pubsub:
+                    await pubsub.subscribe(self.channel)
+                    # 订阅建立之前的消息可能已丢失
+                    self.clear_all()
+                    while True:
+                        message = await pubsub.get_message(timeout=self.ping_interval)
+                        if message is None:
+                            # 主动探活, 连接静默断开时尽快重连
+                            await pubsub.ping()
+                            continue
+                        if message["type"] == "message":
+                            self._on_message(message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"失效广播订阅中断, 1s后重连: {e}")
+                await asyncio.sleep(1)
+            finally:
+                await r.aclose()
+
+    async def start(self, client_factory: Callable[[], Redis]) -> None:
+        if self._task and not self._task.done():
+            return
+        self._task = asyncio.create_task(self._listen(client_factory))
+
+    async def stop(self) -> None:
+        if not self._task:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+
+invalidation_bus = InvalidationBus(GeneralCacheKey.InvalidationChannel.value)
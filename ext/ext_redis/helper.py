@@ -1,6 +1,7 @@
 from core.types import ApiException
 from config.main import local_configs
 from util.general import generate_random_string
+from core.response import ResponseCodeEnum
 
 
 async def generate_captcha_code(
@@ -9,34 +10,27 @@ async def generate_captcha_code(
     all_digits: bool = False,
     excludes: list[str] | None = None,
     expire_seconds: int = 60 * 5,
+    code: str | None = None,
 ) -> str:
+    """code 为空时随机生成"""
     # if await AsyncRedisUtil.get(unique_key):
     #     raise ApiException(
     #         message=RequestLimitedMsg,
     #         code=ResponseCodeEnum.request_limited.value,  # type: ignore
     #     )
-    code = generate_random_string(length, all_digits, excludes)
-    async with local_configs.extensions.redis.instance as r:
-        if await r.get(unique_key):
-            raise ApiException(
-                message="验证码太频繁",
-                code=ResponseCodeEnum.request_limited.value,  # type: ignore
-            )
-        await r.set(
-            unique_key,
-            code,
-            ex=expire_seconds,
+    code = code or generate_random_string(length, all_digits, excludes)
+    # SET NX EX: 判断是否频繁与写入一次往返完成
+    if not await local_configs.extensions.redis.client.set(unique_key, code, ex=expire_seconds, nx=True):
+        raise ApiException(
+            message="验证码太频繁",
+            code=ResponseCodeEnum.request_limited.value,  # type: ignore
         )
     return code
 
 
 async def verify_captcha_code(unique_key: str, code: str) -> bool:
-    async with local_configs.extensions.redis.instance as r:
-        cached_code = await r.get(unique_key)
-        if not cached_code:
-            return False
-        cached_code = str(cached_code)
-        result: bool = cached_code.lower() == code.lower()
-        if result:
-            await r.delete(unique_key)
-    return result
+    """验证码只能校验一次, 无论是否正确都会删除"""
+    cached_code = await local_configs.extensions.redis.client.getdel(unique_key)
+    if not cached_code:
+        return False
+    return str(cached_code).lower() == code.lower()
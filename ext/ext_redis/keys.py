@@ -1,17 +1,57 @@
 from enum import Enum, unique
+from typing import Any
+
+# 集群模式下这些字段的值包上 {} 作为 hash tag, 同一账户/ApiKey 的 key 落在同一个 slot
+HASH_TAG_FIELDS = frozenset({"uuid", "account_id", "api_key"})
+
+_hash_tags_enabled = False
+
+
+def enable_hash_tags(enabled: bool) -> None:
+    """RedisConfig 初始化时按部署模式设置, 单机/哨兵模式下 key 保持原格式"""
+    global _hash_tags_enabled
+    _hash_tags_enabled = enabled
+
+
+class CacheKey(str, Enum):
+    def format(self, *args: Any, **kwargs: Any) -> str:  # ruff: noqa: ANN401
+        if _hash_tags_enabled:
+            kwargs = {k: f"{{{v}}}" if k in HASH_TAG_FIELDS else v for k, v in kwargs.items()}
+        return self.value.format(*args, **kwargs)
 
 
 @unique
-class GeneralCacheKey(str, Enum): ...
+class GeneralCacheKey(CacheKey):
+    InvalidationChannel = "General:Channel:Invalidation"  # 本地缓存失效广播频道
+    QueryCount = "General:QueryCount:{table}:{digest}"  # 列表总数缓存, digest 为 COUNT 语句摘要
+    ThirdResponse = "General:Third:{name}:{digest}"  # 三方接口响应缓存
+    RateLimit = "General:RateLimit:{scope}:{dimension}:{identity}"  # 限流滑动窗口
 
 
 @unique
-class UserCenterKey(str, Enum):
+class UserCenterKey(CacheKey):
     AccountApiPermissionSet = "UC:Account:Apis:{uuid}"
-    Token2AccountKey = "UC:Token:{token}"  # Authorization 拼接key， 存储的 acount_id:scene
+    AccountApiPermissionVersion = "UC:Account:ApisVersion:{uuid}"  # 权限集合版本号, 每次刷新 +1
+    # token 格式为 账户ID.随机串, key 带账户ID 与账户其他 key 落在同一个 slot, 存储的 acount_id:scene
+    Token2AccountKey = "UC:Token:{account_id}:{token}"
+    LegacyToken2AccountKey = "UC:Token:{token}"  # 旧格式 token(不含账户ID), 全部过期后可删除
     Account2TokenKey = "UC:Account:{account_id}:{scene}"  # 存储的 token:account_id
     AccountBaseInfo = "UC:Account:BaseInfo:{uuid}"
     CodeUniqueKey = "UC:Code:{scene}:{identifier}"
 
     ApiSecretKey = "ApiKey:SecretKey:{api_key}"  # ApiKey 密钥
     ApiKeyPermissionSet = "ApiKey:Apis:{api_key}"  # ApiKey接口权限
+
+
+def token_account_id(token: str) -> str | None:
+    """token 前缀中的账户ID, 旧格式 token 返回 None"""
+    account_id, sep, _ = token.partition(".")
+    return account_id if sep else None
+
+
+def token_key(token: str) -> str:
+    """Authorization token -> token key, 账户ID 取自 token 前缀"""
+    account_id = token_account_id(token)
+    if account_id is None:
+        return UserCenterKey.LegacyToken2AccountKey.format(token=token)
+    return UserCenterKey.Token2AccountKey.format(account_id=account_id, token=token)
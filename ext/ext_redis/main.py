@@ -1,50 +1,183 @@
-from typing import override
+from typing import Any, Literal, override
 from functools import cached_property
 from contextlib import asynccontextmanager
 from collections.abc import AsyncGenerator
 
+from loguru import logger
 from fastapi import FastAPI
 from pydantic import RedisDsn
 from redis.retry import Retry
-from redis.asyncio import Redis, ConnectionPool
+from redis.asyncio import Redis, Sentinel, RedisCluster
 from redis.backoff import NoBackoff
+from redis.asyncio.connection import parse_url
 
 from config.default import InstanceExtensionConfig, RegisterExtensionConfig
+from ext.ext_redis.keys import enable_hash_tags
+from ext.ext_redis.pool import InstrumentedConnectionPool
+from ext.ext_redis.replica import Address, ReplicaRouter
+from ext.ext_redis.tracking import ClientCacheFamilyEnum, tracking_cache
+from ext.ext_redis.broadcast import invalidation_bus
 
 
 class RedisConfig(RegisterExtensionConfig, InstanceExtensionConfig[AsyncGenerator[Redis, None]]):
+    # standalone/cluster: 节点地址; sentinel: 只取其中的 db、用户名、密码
     url: RedisDsn
+    mode: Literal["standalone", "sentinel", "cluster"] = "standalone"
     max_connections: int = 10
+    # 连接耗尽时等待空闲连接的最长秒数, 仅 standalone
+    pool_timeout: float | None = 5
+    # sentinel 地址 host:port
+    sentinels: list[str] = []
+    service_name: str = "mymaster"
+    # 读写分离, 只读请求(read_instance)走副本
+    read_from_replicas: bool = False
+    # standalone 模式的副本地址; sentinel 模式自动发现; cluster 模式由客户端路由, 不检查复制延迟
+    replica_urls: list[RedisDsn] = []
+    # 副本允许的最大复制延迟(秒), 超过时读请求回到主节点
+    max_replica_lag: int = 1
+    replica_check_interval: float = 5
+    # 客户端缓存(CLIENT TRACKING), ClientCacheFamilyEnum 值 -> 内存上限(字节), cluster 模式不支持
+    client_side_cache: dict[ClientCacheFamilyEnum, int] = {}
+
+    def model_post_init(self, context: Any, /) -> None:  # ruff: noqa: ANN401
+        # key 格式需要在任何 key 生成之前确定
+        enable_hash_tags(self.mode == "cluster")
+
+    def _connection_kwargs(self) -> dict[str, Any]:
+        return {
+            "decode_responses": True,
+            "encoding_errors": "strict",
+            "retry": Retry(NoBackoff(), retries=10),
+            "health_check_interval": 30,
+        }
+
+    def _auth_kwargs(self) -> dict[str, Any]:
+        parsed = parse_url(str(self.url))
+        return {k: parsed[k] for k in ("db", "username", "password") if k in parsed}
 
     @cached_property
-    def connection_pool(self) -> ConnectionPool:
-        return ConnectionPool.from_url(  # type: ignore
+    def connection_pool(self) -> InstrumentedConnectionPool:
+        return InstrumentedConnectionPool.from_url(  # type: ignore
             url=str(self.url),
             max_connections=self.max_connections,
-            decode_responses=True,
-            encoding_errors="strict",
-            retry=Retry(NoBackoff(), retries=10),
-            health_check_interval=30,
+            timeout=self.pool_timeout,
+            **self._connection_kwargs(),
+        )
+
+    @cached_property
+    def sentinel(self) -> Sentinel:
+        assert self.sentinels, "sentinel mode requires sentinels"
+        return Sentinel(
+            [(host, int(port)) for host, _, port in (i.rpartition(":") for i in self.sentinels)],
+            **self._auth_kwargs(),
+            **self._connection_kwargs(),
         )
 
+    @cached_property
+    def client(self) -> Redis:
+        """进程内共享的长连接客户端, 每条命令从连接池取用连接; cluster 模式下为 RedisCluster"""
+        match self.mode:
+            case "sentinel":
+                return self.sentinel.master_for(self.service_name, max_connections=self.max_connections)
+            case "cluster":
+                return RedisCluster.from_url(  # type: ignore
+                    str(self.url),
+                    read_from_replicas=self.read_from_replicas,
+                    max_connections=self.max_connections,
+                    **self._connection_kwargs(),
+                )
+        return Redis(connection_pool=self.connection_pool)
+
+    @cached_property
+    def replica_router(self) -> ReplicaRouter:
+        if self.mode == "sentinel":
+
+            async def discover() -> list[Address]:
+                return [(str(h), int(p)) for h, p in await self.sentinel.discover_slaves(self.service_name)]
+
+            def client_factory(address: Address) -> Redis:
+                return Redis(
+                    host=address[0],
+                    port=address[1],
+                    max_connections=self.max_connections,
+                    **self._auth_kwargs(),
+                    **self._connection_kwargs(),
+                )
+
+        else:
+            urls = {(url.host, url.port or 6379): str(url) for url in self.replica_urls}
+
+            async def discover() -> list[Address]:
+                return list(urls)  # type: ignore
+
+            def client_factory(address: Address) -> Redis:
+                return Redis.from_url(
+                    urls[address], max_connections=self.max_connections, **self._connection_kwargs()
+                )
+
+        return ReplicaRouter(self.max_replica_lag, self.replica_check_interval, discover, client_factory)
+
+    @property
+    def read_client(self) -> Redis:
+        """只读客户端, 可能读到 max_replica_lag 秒内的旧数据; 没有可用副本时为主节点"""
+        if not self.read_from_replicas or self.mode == "cluster":
+            return self.client
+        return self.replica_router.pick() or self.client
+
     @property
     @asynccontextmanager
     @override
     async def instance(self) -> AsyncGenerator[Redis, None]:  # type: ignore
-        r: Redis | None = None
-        try:
-            r = Redis.from_pool(
-                connection_pool=self.connection_pool,
-            )
-            yield r
-        finally:
-            if r:
-                await r.close()
+        # 兼容 async with 用法, 退出时不关闭客户端和连接池
+        yield self.client
+
+    @property
+    @asynccontextmanager
+    async def read_instance(self) -> AsyncGenerator[Redis, None]:
+        yield self.read_client
+
+    @property
+    def pool_stats(self) -> dict[str, int | float]:
+        stats: dict[str, int | float] = {}
+        if self.mode == "standalone":
+            stats.update(self.connection_pool.stats)
+        if self.read_from_replicas and self.mode != "cluster":
+            stats.update(self.replica_router.stats)
+        return stats
+
+    def subscriber(self) -> Redis:
+        """订阅独占连接, 不占用共享连接池"""
+        if self.mode == "sentinel":
+            return self.sentinel.master_for(self.service_name)
+        # cluster 模式下 PUBLISH 会广播到所有节点, 订阅任一节点即可
+        return Redis.from_url(
+            url=str(self.url),
+            decode_responses=True,
+            encoding_errors="strict",
+        )
 
     @override
-    async def register(self) -> None: ...
+    async def register(self) -> None:
+        await invalidation_bus.start(self.subscriber)
+        if self.read_from_replicas and self.mode != "cluster":
+            await self.replica_router.start(self.client)
+        if self.client_side_cache:
+            if self.mode == "cluster":
+                logger.warning("cluster 模式不支持客户端缓存")
+            else:
+                tracking_cache.configure({k.value: v for k, v in self.client_side_cache.items()})
+                await tracking_cache.start(self.subscriber, self.client)
 
     @override
     async def unregister(self) -> None:
-        if self.connection_pool:
-            await self.connection_pool.aclose()
+        await invalidation_bus.stop()
+        await tracking_cache.stop()
+        if "replica_router" in self.__dict__:
+            await self.__dict__.pop("replica_router").stop()
+        if "client" in self.__dict__:
+            await self.__dict__.pop("client").aclose()
+        if "connection_pool" in self.__dict__:
+            await self.__dict__.pop("connection_pool").aclose()
+        if "sentinel" in self.__dict__:
+            for sentinel in self.__dict__.pop("sentinel").sentinels:
+                await sentinel.aclose()
@@ -0,0 +1,61 @@
+"""带统计的 redis 连接池"""
+
+import time
+
+from redis.asyncio import BlockingConnectionPool
+from redis.exceptions import ConnectionError
+from redis.asyncio.connection import AbstractConnection
+
+
+class InstrumentedConnectionPool(BlockingConnectionPool):
+    """连接耗尽时等待空闲连接(最多 timeout 秒)而不是直接报错, 并记录获取连接的等待时间"""
+
+    acquired: int
+    created: int
+    timeouts: int
+    waiting: int
+    wait_seconds_total: float
+    wait_seconds_max: float
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.acquired = 0
+        self.created = 0
+        self.timeouts = 0
+        self.waiting = 0
+        self.wait_seconds_total = 0
+        self.wait_seconds_max = 0
+
+    def make_connection(self) -> AbstractConnection:
+        self.created += 1
+        return super().make_connection()
+
+    async def get_connection(self, *args, **kwargs) -> AbstractConnection:
+        start = time.perf_counter()
+        self.waiting += 1
+        try:
+            connection = await super().get_connection()
+        except ConnectionError:
+            self.timeouts += 1
+            raise
+        finally:
+            self.waiting -= 1
+        waited = time.perf_counter() - start
+        self.acquired += 1
+        self.wait_seconds_total += waited
+        self.wait_seconds_max = max(self.wait_seconds_max, waited)
+        return connection
+
+    @property
+    def stats(self) -> dict[str, int | float]:
+        return {
+            "max_connections": self.max_connections,
+            "in_use": len(self._in_use_connections),
+            "idle": len(self._available_connections),
+            "waiting": self.waiting,
+            "acquired": self.acquired,
+            "created": self.created,
+            "timeouts": self.timeouts,
+            "wait_seconds_avg": self.wait_seconds_total / self.acquired if self.acquired else 0.0,
+            "wait_seconds_max": self.wait_seconds_max,
+        }
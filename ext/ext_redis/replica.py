@@ -0,0 +1,101 @@
+"""只读副本路由"""
+
+import asyncio
+import itertools
+from collections.abc import Callable, Awaitable
+
+from loguru import logger
+from redis.asyncio import Redis
+
+Address = tuple[str, int]
+
+
+class ReplicaRouter:
+    """定期读取主节点 INFO replication, 只把复制延迟不超过 max_lag 秒的在线副本用于读请求
+
+    副本地址与主节点上报的 ip:port 不一致(如 NAT)时该副本不会被使用
+    """
+
+    max_lag: int
+    interval: float
+    _discover: Callable[[], Awaitable[list[Address]]]
+    _client_factory: Callable[[Address], Redis]
+    _clients: dict[Address, Redis]
+    _healthy: list[Redis]
+    _counter: itertools.count
+    _task: asyncio.Task | None
+
+    def __init__(
+        self,
+        max_lag: int,
+        interval: float,
+        discover: Callable[[], Awaitable[list[Address]]],
+        client_factory: Callable[[Address], Redis],
+    ) -> None:
+        self.max_lag = max_lag
+        self.interval = interval
+        self._discover = discover
+        self._client_factory = client_factory
+        self._clients = {}
+        self._healthy = []
+        self._counter = itertools.count()
+        self._task = None
+
+    def _client(self, address: Address) -> Redis:
+        client = self._clients.get(address)
+        if client is None:
+            client = self._clients[address] = self._client_factory(address)
+        return client
+
+    async def check(self, master: Redis) -> None:
+        addresses = await self._discover()
+        info = await master.info("replication")
+        replicas = {}
+        for key, value in info.items():
+            if key.startswith("slave") and isinstance(value, dict):
+                replicas[(str(value["ip"]), int(value["port"]))] = value
+        healthy = []
+        for address in addresses:
+            state = replicas.get(address)
+            if state and state.get("state") == "online" and int(state.get("lag", 0)) <= self.max_lag:
+                healthy.append(self._client(address))
+        if addresses and not healthy:
+            logger.warning(f"没有可用的 redis 副本, 读请求回到主节点: {addresses}")
+        self._healthy = healthy
+
+    def pick(self) -> Redis | None:
+        if not self._healthy:
+            return None
+        return self._healthy[next(self._counter) % len(self._healthy)]
+
+    async def _run(self, master: Redis) -> None:
+        while True:
+            try:
+                await self.check(master)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._healthy = []
+                logger.warning(f"redis 副本检查失败, 读请求回到主节点: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def start(self, master: Redis) -> None:
+        if self._task and not self._task.done():
+            return
+        self._task = asyncio.create_task(self._run(master))
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._healthy = []
+        await asyncio.gather(*(client.aclose() for client in self._clients.values()))
+        self._clients.clear()
+
+    @property
+    def stats(self) -> dict[str, int]:
+        return {"replicas": len(self._clients), "healthy": len(self._healthy)}
@@ -0,0 +1,69 @@
+"""服务端 lua 脚本"""
+
+from redis.asyncio import Redis
+from redis.commands.core import AsyncScript
+
+# token -> account -> 权限校验, 一次往返完成
+# KEYS[1]: token key; KEYS[2]: 账户权限集合 key, 与 token key 带同一个账户ID hash tag
+# ARGV[1..]: 候选权限码, 任一命中即有权限
+# 返回: token 不存在时为 {nil}, 否则为 {account_id:scene, token 剩余毫秒, 候选权限码是否命中...}
+TOKEN_PERMISSION_CHECK = """
+local identifier = redis.call('GET', KEYS[1])
+if not identifier then
+    return {false}
+end
+local result = {identifier, redis.call('PTTL', KEYS[1])}
+if #ARGV > 0 then
+    local flags = redis.call('SMISMEMBER', KEYS[2], unpack(ARGV))
+    for i = 1, #flags do
+        result[#result + 1] = flags[i]
+    end
+end
+return result
+"""
+
+# 多个维度的滑动窗口限流, 全部维度未超限才计入, 时间取服务端 TIME 避免各 worker 时钟偏差
+# KEYS[i]: 第 i 个维度的计数 zset
+# ARGV[1]: 本次请求的唯一标识; ARGV[2i], ARGV[2i+1]: 第 i 个维度的窗口毫秒数与次数上限
+# 返回: {是否放行, 被拒绝时距离可重试的毫秒数}
+SLIDING_WINDOW_LIMIT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local retry = 0
+for i = 1, #KEYS do
+    local window = tonumber(ARGV[i * 2])
+    redis.call('ZREMRANGEBYSCORE', KEYS[i], '-inf', now - window)
+    if redis.call('ZCARD', KEYS[i]) >= tonumber(ARGV[i * 2 + 1]) then
+        local oldest = redis.call('ZRANGE', KEYS[i], 0, 0, 'WITHSCORES')
+        retry = math.max(retry, tonumber(oldest[2]) + window - now)
+    end
+end
+if retry > 0 then
+    return {0, retry}
+end
+for i = 1, #KEYS do
+    redis.call('ZADD', KEYS[i], now, ARGV[1])
+    redis.call('PEXPIRE', KEYS[i], ARGV[i * 2])
+end
+return {1, 0}
+"""
+
+
+class LuaScript:
+    """首次调用时注册, 之后走 EVALSHA, 服务端缓存丢失(NOSCRIPT)时自动重新加载"""
+
+    source: str
+    _script: AsyncScript | None
+
+    def __init__(self, source: str) -> None:
+        self.source = source
+        self._script = None
+
+    async def __call__(self, r: Redis, keys: list[str], args: list[str]) -> list:
+        if self._script is None:
+            self._script = r.register_script(self.source)
+        return await self._script(keys=keys, args=args, client=r)  # type: ignore
+
+
+token_permission_check = LuaScript(TOKEN_PERMISSION_CHECK)
+sliding_window_limit = LuaScript(SLIDING_WINDOW_LIMIT)
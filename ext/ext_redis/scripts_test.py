@@ -0,0 +1,50 @@
+from collections.abc import Iterator
+
+import pytest
+from redis.crc import key_slot
+from redis.asyncio import Redis
+
+from ext.ext_redis import keys
+from ext.ext_redis.scripts import token_permission_check
+
+
+@pytest.fixture
+def hash_tags() -> Iterator[None]:
+    keys.enable_hash_tags(True)
+    yield
+    keys.enable_hash_tags(False)
+
+
+@pytest.fixture
+def fake_redis() -> Redis:
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    return fakeredis.FakeAsyncRedis(decode_responses=True)
+
+
+def test_token_and_permission_keys_share_slot(hash_tags: None) -> None:
+    token = "42.abcdef"
+    token_key = keys.token_key(token)
+    perm_key = keys.UserCenterKey.AccountApiPermissionSet.format(uuid=keys.token_account_id(token))
+    assert perm_key == "UC:Account:Apis:{42}"
+    assert key_slot(token_key.encode()) == key_slot(perm_key.encode())
+
+
+@pytest.mark.asyncio
+async def test_token_permission_check(hash_tags: None, fake_redis: Redis) -> None:
+    token = "42.abcdef"
+    perm_key = keys.UserCenterKey.AccountApiPermissionSet.format(uuid="42")
+    await fake_redis.set(keys.token_key(token), "42:web", px=60000)
+    await fake_redis.sadd(perm_key, "app:GET:/items")
+
+    result = await token_permission_check(
+        fake_redis,
+        keys=[keys.token_key(token), perm_key],
+        args=["*", "app:*", "app:GET:/items"],
+    )
+    assert result[0] == "42:web"
+    assert 0 < result[1] <= 60000
+    assert result[2:] == [0, 0, 1]
+
+    result = await token_permission_check(fake_redis, keys=[keys.token_key("42.missing"), perm_key], args=["*"])
+    assert result == [None]
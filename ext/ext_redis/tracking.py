@@ -0,0 +1,218 @@
+"""热点 key 客户端缓存
+
+基于 CLIENT TRACKING 广播模式: 订阅连接订阅 __redis__:invalidate, 另一条连接以 REDIRECT 方式
+开启对指定前缀的跟踪, 任何客户端修改这些前缀下的 key 时服务端推送失效消息.
+redis-py asyncio 客户端不处理 RESP3 推送, 所以使用 RESP2 的 REDIRECT 方式.
+跟踪未建立或连接中断期间不使用本地缓存, 重连后清空全部本地缓存. cluster 模式不支持.
+"""
+
+import sys
+import asyncio
+from enum import unique
+from typing import Any, TypeVar
+from collections.abc import Mapping, Callable, Awaitable
+
+from loguru import logger
+from redis.asyncio import Redis
+
+from core.types import StrEnum
+from util.cache import StatsLRUCache
+from ext.ext_redis.keys import CacheKey, UserCenterKey
+
+INVALIDATE_CHANNEL = "__redis__:invalidate"
+
+T = TypeVar("T")
+
+_MISSING = object()
+
+
+@unique
+class ClientCacheFamilyEnum(StrEnum):
+    """可启用客户端缓存的 key 族"""
+
+    account_api_permission = ("account_api_permission", "账户接口权限集合")
+    api_key_secret = ("api_key_secret", "ApiKey 密钥")
+    api_key_permission = ("api_key_permission", "ApiKey 接口权限集合")
+
+
+FAMILY_KEYS: dict[str, CacheKey] = {
+    ClientCacheFamilyEnum.account_api_permission.value: UserCenterKey.AccountApiPermissionSet,
+    ClientCacheFamilyEnum.api_key_secret.value: UserCenterKey.ApiSecretKey,
+    ClientCacheFamilyEnum.api_key_permission.value: UserCenterKey.ApiKeyPermissionSet,
+}
+
+
+def _sizeof(value: Any) -> int:  # ruff: noqa: ANN401
+    size = sys.getsizeof(value)
+    if isinstance(value, frozenset):
+        size += sum(sys.getsizeof(i) for i in value)
+    return size
+
+
+class _Family:
+    name: str
+    prefix: str
+    cache: StatsLRUCache
+    # 每次失效 +1, 加载期间发生失效时不写入缓存
+    generation: int
+    invalidations: int
+
+    def __init__(self, name: str, max_bytes: int) -> None:
+        self.name = name
+        self.prefix = FAMILY_KEYS[name].value.split("{", 1)[0]
+        self.cache = StatsLRUCache(maxsize=max_bytes, getsizeof=_sizeof)
+        self.generation = 0
+        self.invalidations = 0
+
+    def invalidate(self, key: str | None) -> None:
+        self.generation += 1
+        self.invalidations += 1
+        if key is None:
+            self.cache.clear()
+        else:
+            self.cache.pop(key, None)
+
+
+class TrackingCache:
+    ping_interval: float
+    _families: list[_Family]
+    _client: Redis | None  # 缓存未命中时读取主节点, 避免副本延迟写入旧值
+    _connected: bool
+    _task: asyncio.Task | None
+
+    def __init__(self, ping_interval: float = 10) -> None:
+        self.ping_interval = ping_interval
+        self._families = []
+        self._client = None
+        self._connected = False
+        self._task = None
+
+    def configure(self, families: Mapping[str, int]) -> None:
+        """families: key 族 -> 缓存值的内存上限(字节)"""
+        self._families = [_Family(name, max_bytes) for name, max_bytes in families.items()]
+
+    def _family(self, key: str) -> _Family | None:
+        if not self._connected:
+            return None
+        for family in self._families:
+            if key.startswith(family.prefix):
+                return family
+        return None
+
+    def tracks(self, key: str) -> bool:
+        return self._family(key) is not None
+
+    async def _load(self, family: _Family, key: str, loader: Callable[[], Awaitable[T]]) -> T:
+        value = family.cache.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        generation = family.generation
+        value = await loader()
+        if self._connected and generation == family.generation:
+            try:
+                family.cache[key] = value
+            except ValueError:
+                # 单个值超过内存上限
+                pass
+        return value
+
+    async def get(self, r: Redis, key: str) -> str | None:
+        family = self._family(key)
+        if family is None:
+            return await r.get(key)
+        return await self._load(family, key, lambda: self._client.get(key))  # type: ignore
+
+    async def smembers(self, r: Redis, key: str) -> frozenset[str]:
+        family = self._family(key)
+        if family is None:
+            return frozenset(await r.smembers(key))  # type: ignore
+
+        async def loader() -> frozenset[str]:
+            return frozenset(await self._client.smembers(key))  # type: ignore
+
+        return await self._load(family, key, loader)
+
+    async def smismember(self, r: Redis, key: str, values: list[str]) -> list[bool]:
+        if not self.tracks(key):
+            return [bool(i) for i in await r.smismember(key, values)]  # type: ignore
+        members = await self.smembers(r, key)
+        return [v in members for v in values]
+
+    def _invalidate(self, keys: list[str] | None) -> None:
+        for family in self._families:
+            if keys is None:
+                family.invalidate(None)
+                continue
+            for key in keys:
+                if key.startswith(family.prefix):
+                    family.invalidate(key)
+
+    async def _listen(self, client_factory: Callable[[], Redis]) -> None:
+        prefixes = [arg for family in self._families for arg in ("PREFIX", family.prefix)]
+        while True:
+            r = client_factory()
+            try:
+                subscriber = await r.connection_pool.get_connection()
+                await subscriber.send_command("CLIENT", "ID")
+                client_id = await subscriber.read_response()
+                await subscriber.send_command("SUBSCRIBE", INVALIDATE_CHANNEL)
+                await subscriber.read_response()
+                tracker = await r.connection_pool.get_connection()
+                await tracker.send_command("CLIENT", "TRACKING", "ON", "REDIRECT", client_id, "BCAST", *prefixes)
+                await tracker.read_response()
+                # 跟踪建立之前的修改不会通知
+                self._invalidate(None)
+                self._connected = True
+                while True:
+                    message = await subscriber.read_response(timeout=self.ping_interval)
+                    if message is None:
+                        # 两条连接都需要存活, 跟踪连接断开后服务端不再推送
+                        await tracker.send_command("PING")
+                        await tracker.read_response()
+                        await subscriber.send_command("PING")
+                        continue
+                    if message[0] == "message":
+                        self._invalidate(message[2])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"客户端缓存跟踪中断, 1s后重连: {e}")
+                await asyncio.sleep(1)
+            finally:
+                self._connected = False
+                self._invalidate(None)
+                await r.aclose()
+
+    async def start(self, client_factory: Callable[[], Redis], client: Redis) -> None:
+        if not self._families or (self._task and not self._task.done()):
+            return
+        self._client = client
+        self._task = asyncio.create_task(self._listen(client_factory))
+
+    async def stop(self) -> None:
+        if not self._task:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._client = None
+
+    @property
+    def stats(self) -> dict[str, Any]:
+        return {
+            "connected": self._connected,
+            "families": {
+                family.name: {
+                    **family.cache.stats,
+                    "bytes": family.cache.currsize,
+                    "invalidations": family.invalidations,
+                }
+                for family in self._families
+            },
+        }
+
+
+tracking_cache = TrackingCache()
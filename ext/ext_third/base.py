@@ -2,20 +2,23 @@
 
 from __future__ import annotations
 
+import re
 import abc
 import enum
-import socket
 import string
 import asyncio
+import weakref
 import ipaddress
+import itertools
 from json import JSONDecodeError
 from typing import Any, Generic, TypeVar, ParamSpec
 from functools import partial
-from collections.abc import Callable, Awaitable
+from collections import defaultdict
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+from collections.abc import Mapping, Callable, Iterable, Awaitable, AsyncIterator
 
 import httpx
 from loguru import logger
-from _socket import gaierror
 from pydantic import BaseModel
 from starlette_context import context
 
@@ -23,6 +26,9 @@ from core.types import ResponseHeaderKeyEnum
 from util.general import await_in_sync
 from core.response import ResponseCodeEnum
 from core.middleware import RequestIdPlugin
+from ext.ext_third.dns import CachedDNSTransport
+from ext.ext_third.cache import CachePolicy
+from ext.ext_third.resilience import ResiliencePolicy
 
 
 def only_alphabetic_numeric(value: str) -> bool:
@@ -34,17 +40,21 @@ def only_alphabetic_numeric(value: str) -> bool:
     return True
 
 
+# 允许下划线: 内网/服务发现的主机名常带 _, getaddrinfo 可以解析
+HOSTNAME_LABEL = re.compile(r"^(?!-)[A-Za-z0-9_-]{1,63}(?<!-)$")
+
+
 def validate_ip_or_host(value: int | str) -> tuple[bool, str]:
+    """只做格式校验, 域名解析在请求时异步完成(见 ext.ext_third.dns)"""
     try:
         return True, str(ipaddress.ip_address(value))
     except ValueError:
         if isinstance(value, int):
-            return False, "不支持数字IP - {value}"
-        try:
-            socket.gethostbyname(value)
-            return True, value
-        except gaierror as e:
-            return False, f"获取HOST{value}失败: {e}"
+            return False, f"不支持数字IP - {value}"
+        host = value.rstrip(".")
+        if len(host) > 253 or not all(HOSTNAME_LABEL.match(label) for label in host.split(".")):  # noqa: PLR2004
+            return False, f"HOST格式错误: {value}"
+        return True, value
 
 
 DATA_SEND_WAYS = ["auto", "json", "params", "data"]
@@ -80,6 +90,8 @@ class Response(BaseModel, Generic[DataT]):
     code: int | None = None  # 业务代码
     trace_id: str | None = None
     request_context: dict
+    # 缓存来源: local / redis / coalesced, 实际请求为 None
+    from_cache: str | None = None
 
     # @abc.abstractclassmethod
     @classmethod
@@ -91,6 +103,8 @@ class Response(BaseModel, Generic[DataT]):
         raise NotImplementedError
 
     def __repr__(self) -> str:
+        if self.from_cache:
+            return f"success: {self.success}, status_code: {self.status_code}, from_cache: {self.from_cache}"
         return f"success: {self.success}, status_code: {self.status_code}"
 
 
@@ -146,6 +160,8 @@ class API:
     cookies: dict | None
     method: str
     uri: str  # /xx
+    cache_policy: CachePolicy | None
+    resilience: ResiliencePolicy | None
 
     def __init__(
         self,
@@ -162,6 +178,8 @@ class API:
         data: dict | None = None,
         json: dict | None = None,
         timeout: int | None = None,
+        cache_policy: CachePolicy | None = None,
+        resilience: ResiliencePolicy | None = None,
     ) -> None:
         assert name, "name cannot be empty"
         assert (
@@ -190,13 +208,15 @@ class API:
         self.response_cls = response_cls
         self.cookies = cookies
         self.timeout = timeout
+        if cache_policy:
+            assert cache_policy.cacheable(method), f"cache policy does not allow method: {method}"
+        self.cache_policy = cache_policy
+        self.resilience = resilience
 
 
-async def default_request_proxy(request_kwargs: dict) -> RawResponseType:
-    async with httpx.AsyncClient() as client:
-        return await client.request(
-            **request_kwargs,
-        )
+def _reject_cookies() -> CookieJar:
+    """共享客户端不保存响应 Set-Cookie, 避免在不同调用方之间串用会话; 请求 cookies 仍按次传入"""
+    return CookieJar(policy=DefaultCookiePolicy(allowed_domains=[]))
 
 
 class Third:
@@ -205,6 +225,18 @@ class Third:
     host: str
     response_cls: ResponseClsType
     _request: Callable[[dict], Awaitable[RawResponseType]]
+    # 实例独占的连接池, 由 ThirdConfig.register/unregister 打开和关闭
+    _client: httpx.AsyncClient | None = None
+    limits: httpx.Limits | None = None
+    http2: bool | None = None
+    # 未单独指定时的连接池配置, ThirdConfig.register 时设置
+    default_limits: httpx.Limits = httpx.Limits(max_connections=100, max_keepalive_connections=20)
+    default_http2: bool = False
+    # 连接复用统计, 由 httpcore trace 事件更新
+    requests_total: int = 0
+    new_connections: int = 0
+    in_flight: int = 0
+    peak_in_flight: int = 0
     port: int | None
     headers: dict | None
     params: dict | None
@@ -218,6 +250,8 @@ class Third:
     api_key: str | None = None
     sign_key: str | None = None
     verify_ssl: bool = True
+    # 熔断/重试/对冲, API 未指定时使用
+    resilience: ResiliencePolicy | None = None
 
     def __init__(
         self,
@@ -233,10 +267,16 @@ class Third:
         json: dict | None = None,
         cookies: dict | None = None,
         timeout: int = 6,
-        _request: Callable[
-            [dict],
-            Awaitable[RawResponseType],
-        ] = default_request_proxy,
+        _request: (
+            Callable[
+                [dict],
+                Awaitable[RawResponseType],
+            ]
+            | None
+        ) = None,
+        limits: httpx.Limits | None = None,
+        http2: bool | None = None,
+        resilience: ResiliencePolicy | None = None,
     ) -> None:
         assert all(
             [name, protocol, host, response_cls],
@@ -259,7 +299,12 @@ class Third:
         self.response_cls = response_cls
         self.cookies = cookies
         self.timeout = timeout
-        self._request = _request
+        # 未指定时使用实例连接池
+        self._request = _request or self.client_request
+        self.limits = limits
+        self.http2 = http2
+        self.resilience = resilience
+        third_registry.add(self)
         if apis:
             self.apis = set(apis)
             for api in apis:
@@ -274,6 +319,75 @@ class Third:
         # if request:
         # self._request = request
 
+    def open(self) -> None:
+        if self._client is not None and not self._client.is_closed:
+            return
+        http2 = self.default_http2 if self.http2 is None else self.http2
+        if http2:
+            try:
+                import h2  # type: ignore # noqa: F401
+            except ImportError:
+                logger.warning(f"Third-{self.name}: 未安装 h2(httpx[http2]), 使用 HTTP/1.1")
+                http2 = False
+        self._client = httpx.AsyncClient(
+            transport=CachedDNSTransport(
+                limits=self.limits or self.default_limits,
+                http2=http2,
+                verify=self.verify_ssl,
+            ),
+            cookies=_reject_cookies(),
+        )
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # 未经 ThirdConfig.register 打开时(如脚本中)按默认配置创建
+        if self._client is None or self._client.is_closed:
+            self.open()
+        return self._client  # type: ignore
+
+    async def _trace(self, event_name: str, info: dict) -> None:
+        if event_name == "connection.connect_tcp.complete":
+            self.new_connections += 1
+        elif event_name.endswith(".send_request_headers.started"):
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        elif event_name.endswith((".response_closed.complete", ".response_closed.failed")):
+            # 请求失败时同样会关闭响应
+            self.in_flight -= 1
+
+    async def client_request(self, request_kwargs: dict) -> RawResponseType:
+        extensions = {"trace": self._trace, **(request_kwargs.pop("extensions", None) or {})}
+        self.requests_total += 1
+        return await self.client.request(**request_kwargs, extensions=extensions)
+
+    @property
+    def client_metrics(self) -> dict[str, int | float | None]:
+        """连接池使用情况及连接复用率, in_flight 接近 max_connections 时请求在排队等待连接"""
+        return {
+            "requests": self.requests_total,
+            "new_connections": self.new_connections,
+            "reuse_ratio": 1 - self.new_connections / self.requests_total if self.requests_total else 0.0,
+            "max_connections": (self.limits or self.default_limits).max_connections,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+        }
+
+    @property
+    def breaker_states(self) -> dict[str, dict[str, str | int | float]]:
+        """Third 及各 API 的熔断器状态"""
+        states = {}
+        if self.resilience and self.resilience.breaker:
+            states[self.name] = self.resilience.breaker.snapshot
+        for api in self.apis:
+            if api.resilience and api.resilience.breaker:
+                states[f"{self.name}.{api.name}"] = api.resilience.breaker.snapshot
+        return states
+
     def register_api(self, api: API) -> None:
         assert (
             all(i in string.ascii_lowercase + string.ascii_uppercase + string.digits + "_" for i in api.name)
@@ -364,8 +478,29 @@ class Third:
 
         request_context["kwargs"] = kwargs
 
+        if api.cache_policy:
+            return await api.cache_policy.get_or_fetch(
+                self.name,
+                api.cache_policy.key(self.name, request_context),
+                request_context,
+                response_cls,
+                partial(self._send, api, request_kwargs, request_context, response_cls),
+            )
+        return await self._send(api, request_kwargs, request_context, response_cls)
+
+    async def _send(
+        self,
+        api: API,
+        request_kwargs: dict,
+        request_context: dict,
+        response_cls: ResponseClsType,
+    ) -> Response[Any]:
+        resilience = api.resilience or self.resilience
         try:
-            raw_response = await self._request(request_kwargs)
+            if resilience:
+                raw_response = await resilience.execute(self._request, request_kwargs)
+            else:
+                raw_response = await self._request(request_kwargs)
         except Exception as e:
             logger.bind(json=True).error(
                 {
@@ -411,6 +546,10 @@ class Third:
         return response_cls.parse_response(raw_response, request_context)
 
 
+# 全部 Third 实例, 由 ThirdConfig 统一管理连接池
+third_registry: weakref.WeakSet[Third] = weakref.WeakSet()
+
+
 async def fetch(
     client: httpx.AsyncClient,
     response_cls: type[Response],
@@ -451,8 +590,67 @@ async def fetch(
         return response_cls.parse_response(raw_response, request_context)
 
 
+# 批量请求默认超时, 避免单个请求无限挂起
+MULTI_FETCH_TIMEOUT = httpx.Timeout(30, connect=5)
+
+RequestItem = tuple[type[Response], dict[str, Any]]
+
+
+async def multi_fetch_iter(
+    request_map: Mapping[str, RequestItem] | Iterable[tuple[str, RequestItem]],
+    concurrency: int = 100,
+    per_host: int | None = 20,
+    timeout: httpx.Timeout | float = MULTI_FETCH_TIMEOUT,
+    fail_fast: bool = False,
+) -> AsyncIterator[tuple[str, Response]]:
+    """流式批量请求, 按完成顺序返回 (key, response)
+
+    request_map 可以是生成器, 同时在途的请求不超过 concurrency 个, 未发出的请求不会提前构造;
+    per_host 限制单个 host 的并发; fail_fast 时首个失败响应返回后取消其余请求.
+    调用方提前退出时请使用 contextlib.aclosing 以及时取消在途请求
+
+    Args:
+        request_map: 同 multi_fetch
+    """
+    items = iter(request_map.items() if isinstance(request_map, Mapping) else request_map)
+    host_limits: dict[str, asyncio.Semaphore] = defaultdict(lambda: asyncio.Semaphore(per_host or concurrency))
+
+    async with httpx.AsyncClient(
+        transport=CachedDNSTransport(
+            limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
+        ),
+        timeout=timeout,
+        cookies=_reject_cookies(),
+    ) as client:
+
+        async def run(key: str, response_cls: type[Response], request_d: dict[str, Any]) -> tuple[str, Response]:
+            async with host_limits[httpx.URL(request_d["url"]).host]:
+                return key, await fetch(client=client, response_cls=response_cls, **request_d)
+
+        pending: set[asyncio.Task] = set()
+        try:
+            while True:
+                for key, (response_cls, request_d) in itertools.islice(items, concurrency - len(pending)):
+                    pending.add(asyncio.create_task(run(key, response_cls, request_d)))
+                if not pending:
+                    return
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    key, response = task.result()
+                    yield key, response
+                    if fail_fast and not response.success:
+                        return
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+
 async def multi_fetch(
-    request_map: dict[str, tuple[type[Response], dict[str, Any]]],
+    request_map: dict[str, RequestItem],
+    concurrency: int = 500,
+    per_host: int | None = None,
+    timeout: httpx.Timeout | float = MULTI_FETCH_TIMEOUT,
 ) -> dict[str, Response]:
     """批量请求
 
@@ -470,32 +668,12 @@ async def multi_fetch(
             }
 
     Returns:
-        dict[str, Response]: _description_
+        dict[str, Response]: 与 request_map 顺序一致; 大批量请求请使用 multi_fetch_iter
     """
     results = {}
-
-    async with httpx.AsyncClient(
-        limits=httpx.Limits(max_connections=500, max_keepalive_connections=100),
-        timeout=httpx.Timeout(None),
-    ) as client:
-        # Prepare tasks
-        tasks = [
-            fetch(
-                client=client,
-                response_cls=response_cls,
-                **request_d,
-            )
-            for response_cls, request_d in request_map.values()
-        ]
-
-        # Execute tasks concurrently
-        responses = await asyncio.gather(*tasks)
-
-    # Store results in the dictionary
-    for key, response in zip(request_map.keys(), responses, strict=True):
+    async for key, response in multi_fetch_iter(request_map, concurrency, per_host, timeout):
         results[key] = response
-
-    return results
+    return {key: results[key] for key in request_map}
 
 
 def test() -> None:
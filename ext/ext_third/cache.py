@@ -0,0 +1,156 @@
+"""三方接口响应缓存"""
+
+from __future__ import annotations
+
+import math
+import asyncio
+import hashlib
+from typing import TYPE_CHECKING, Any
+from collections.abc import Callable, Iterable, Awaitable
+
+import orjson
+from loguru import logger
+
+from util.cache import StatsTTLCache
+from config.main import local_configs
+from ext.ext_redis.keys import GeneralCacheKey
+
+if TYPE_CHECKING:
+    from ext.ext_third.base import Response
+
+
+class CachePolicy:
+    """API 响应缓存策略
+
+    只缓存成功的响应, 本地 TTL LRU 为一级缓存, 可选 redis 为二级缓存(多 worker 共享);
+    相同请求并发时只发出一次, 其余请求等待同一个 future.
+    缓存中的 request_context 只保留 method/url, 避免请求头等敏感信息写入 redis, 返回时换成当前调用方的上下文.
+    返回的 Response.from_cache 标识来源: local / redis / coalesced, 实际请求为 None
+    """
+
+    ttl: float
+    vary_headers: tuple[str, ...]
+    methods: tuple[str, ...]
+    use_redis: bool
+    local: StatsTTLCache
+    _inflight: dict[str, asyncio.Future]
+
+    def __init__(
+        self,
+        ttl: float,
+        vary_headers: Iterable[str] = (),
+        maxsize: int = 1024,
+        use_redis: bool = False,
+        methods: Iterable[str] = ("get",),
+    ) -> None:
+        self.ttl = ttl
+        # 参与缓存 key 计算的请求头, 其余请求头(如 trace id)不影响缓存
+        self.vary_headers = tuple(sorted(h.lower() for h in vary_headers))
+        self.methods = tuple(m.lower() for m in methods)
+        self.use_redis = use_redis
+        self.local = StatsTTLCache(maxsize=maxsize, ttl=ttl)
+        self._inflight = {}
+
+    def cacheable(self, method: str) -> bool:
+        return method.lower() in self.methods
+
+    def key(self, third_name: str, request_context: dict) -> str:
+        headers = {k.lower(): v for k, v in (request_context.get("headers") or {}).items()}
+        raw = orjson.dumps(
+            [
+                third_name,
+                request_context["method"],
+                request_context["url"],
+                request_context.get("params") or {},
+                [headers.get(h) for h in self.vary_headers],
+                # 请求体(含 kwargs 中的 content/files), 非 GET 请求按请求体区分
+                request_context.get("data"),
+                request_context.get("json"),
+                request_context.get("kwargs") or {},
+            ],
+            option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS,
+            default=str,
+        )
+        return hashlib.sha1(raw).hexdigest()  # noqa: S324
+
+    @staticmethod
+    def _strip(response: Response[Any]) -> Response[Any]:
+        context = response.request_context
+        return response.model_copy(
+            update={"request_context": {"method": context.get("method"), "url": context.get("url")}}
+        )
+
+    async def get_or_fetch(
+        self,
+        third_name: str,
+        key: str,
+        request_context: dict,
+        response_cls: type[Response],
+        fetch: Callable[[], Awaitable[Response[Any]]],
+    ) -> Response[Any]:
+        cached = self.local.get(key)
+        if cached is not None:
+            return cached.model_copy(update={"from_cache": "local", "request_context": request_context})
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            try:
+                response = await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                # 发起请求的协程被取消时自行请求
+                if not inflight.cancelled():
+                    raise
+            else:
+                return response.model_copy(update={"from_cache": "coalesced", "request_context": request_context})
+
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            response = await self._load(third_name, key, request_context, response_cls, fetch)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # 没有等待者时避免 "exception was never retrieved"
+            future.exception()
+            raise
+        else:
+            future.set_result(response)
+            return response
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _load(
+        self,
+        third_name: str,
+        key: str,
+        request_context: dict,
+        response_cls: type[Response],
+        fetch: Callable[[], Awaitable[Response[Any]]],
+    ) -> Response[Any]:
+        redis_key = GeneralCacheKey.ThirdResponse.format(name=third_name, digest=key)
+        if self.use_redis:
+            try:
+                async with local_configs.extensions.redis.instance as r:
+                    raw = await r.get(redis_key)
+                if raw:
+                    response = response_cls.model_validate_json(raw)
+                    self.local[key] = response
+                    return response.model_copy(update={"from_cache": "redis", "request_context": request_context})
+            except Exception as e:
+                logger.warning(f"Third-{third_name} 读取 redis 缓存失败: {e}")
+
+        response = await fetch()
+        if not response.success:
+            return response
+
+        stripped = self._strip(response)
+        self.local[key] = stripped
+        if self.use_redis:
+            try:
+                async with local_configs.extensions.redis.instance as r:
+                    await r.set(redis_key, stripped.model_dump_json(), ex=math.ceil(self.ttl))
+            except Exception as e:
+                logger.warning(f"Third-{third_name} 写入 redis 缓存失败: {e}")
+        return response
@@ -0,0 +1,131 @@
+import asyncio
+from collections.abc import Callable, Awaitable
+
+import pytest
+
+from ext.ext_third.base import Response
+from ext.ext_third.cache import CachePolicy
+
+
+def _context(token: str = "a", trace_id: str = "1") -> dict:
+    return {
+        "method": "GET",
+        "url": "https://example.com/items",
+        "params": {"page": 1},
+        "headers": {"Authorization": token, "X-Trace-Id": trace_id},
+    }
+
+
+def _fetcher(
+    *responses: Response | Exception,
+    delay: float = 0,
+) -> tuple[Callable[[], Awaitable[Response]], list[int]]:
+    """按顺序返回结果的请求函数, calls 记录调用次数"""
+    calls: list[int] = []
+
+    async def fetch() -> Response:
+        calls.append(1)
+        await asyncio.sleep(delay)
+        result = responses[len(calls) - 1]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    return fetch, calls
+
+
+def test_key_vary_headers() -> None:
+    policy = CachePolicy(ttl=60, vary_headers=["authorization"])
+    key = policy.key("third", _context())
+    assert policy.key("third", _context(trace_id="2")) == key
+    assert policy.key("third", _context(token="b")) != key
+    assert policy.key("other", _context()) != key
+
+
+def test_key_request_body() -> None:
+    policy = CachePolicy(ttl=60, methods=["post"])
+    context = {**_context(), "method": "POST", "json": {"q": 1}}
+    key = policy.key("third", context)
+    assert policy.key("third", {**context, "json": {"q": 1}}) == key
+    assert policy.key("third", {**context, "json": {"q": 2}}) != key
+    assert policy.key("third", {**context, "data": {"q": 1}}) != key
+    assert policy.key("third", {**context, "kwargs": {"content": b"a"}}) != policy.key(
+        "third",
+        {**context, "kwargs": {"content": b"b"}},
+    )
+
+
+@pytest.mark.asyncio
+async def test_coalesce_and_local_hit() -> None:
+    policy = CachePolicy(ttl=60)
+    key = policy.key("third", _context())
+    fetch, calls = _fetcher(
+        Response[str](success=True, status_code=200, data="x", request_context=_context()),
+        delay=0.01,
+    )
+
+    first, second = await asyncio.gather(
+        policy.get_or_fetch("third", key, _context(), Response[str], fetch),
+        policy.get_or_fetch("third", key, _context(token="b"), Response[str], fetch),
+    )
+    assert len(calls) == 1
+    assert first.from_cache is None
+    assert second.from_cache == "coalesced"
+    # 合并请求返回调用方自己的上下文
+    assert second.request_context["headers"]["Authorization"] == "b"
+
+    # 缓存中只保留 method/url
+    assert policy.local[key].request_context == {"method": "GET", "url": "https://example.com/items"}
+    hit = await policy.get_or_fetch("third", key, _context(token="c"), Response[str], fetch)
+    assert hit.from_cache == "local"
+    assert hit.data == "x"
+    assert hit.request_context["headers"]["Authorization"] == "c"
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_response_not_cached() -> None:
+    policy = CachePolicy(ttl=60)
+    key = policy.key("third", _context())
+    fetch, calls = _fetcher(
+        Response[str](success=False, status_code=500, request_context=_context()),
+        Response[str](success=True, status_code=200, data="x", request_context=_context()),
+    )
+    assert not (await policy.get_or_fetch("third", key, _context(), Response[str], fetch)).success
+    assert (await policy.get_or_fetch("third", key, _context(), Response[str], fetch)).success
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_error_shared_with_waiters() -> None:
+    policy = CachePolicy(ttl=60)
+    key = policy.key("third", _context())
+    fetch, calls = _fetcher(ValueError("boom"), delay=0.01)
+    results = await asyncio.gather(
+        policy.get_or_fetch("third", key, _context(), Response[str], fetch),
+        policy.get_or_fetch("third", key, _context(), Response[str], fetch),
+        return_exceptions=True,
+    )
+    assert len(calls) == 1
+    assert all(isinstance(result, ValueError) for result in results)
+    assert key not in policy._inflight
+
+
+@pytest.mark.asyncio
+async def test_waiter_fetches_when_leader_cancelled() -> None:
+    policy = CachePolicy(ttl=60)
+    key = policy.key("third", _context())
+    fetch, calls = _fetcher(
+        Response[str](success=True, status_code=200, data="x", request_context=_context()),
+        Response[str](success=True, status_code=200, data="y", request_context=_context()),
+        delay=0.05,
+    )
+    leader = asyncio.ensure_future(policy.get_or_fetch("third", key, _context(), Response[str], fetch))
+    await asyncio.sleep(0)
+    waiter = asyncio.ensure_future(policy.get_or_fetch("third", key, _context(), Response[str], fetch))
+    await asyncio.sleep(0.01)
+    leader.cancel()
+    response = await waiter
+    assert response.data == "y"
+    assert response.from_cache is None
+    assert len(calls) == 2
@@ -0,0 +1,219 @@
+"""进程内 DNS 缓存, 供三方请求的 httpx 连接池使用"""
+
+import time
+import socket
+import asyncio
+import ipaddress
+from contextlib import contextmanager
+from collections.abc import Iterable, Iterator, AsyncIterable, AsyncIterator
+
+import httpx
+import httpcore
+from loguru import logger
+
+
+def is_ip(host: str) -> bool:
+    try:
+        ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return True
+
+
+class DNSCache:
+    """异步解析 + TTL 缓存, 同一 host 并发解析只发起一次"""
+
+    ttl: float
+    negative_ttl: float
+    _entries: dict[str, tuple[float, list[str]]]  # host -> (过期时间, 地址列表), 地址为空表示解析失败
+    _inflight: dict[str, asyncio.Future]
+    _prefetch_task: asyncio.Task | None
+    hits: int
+    misses: int
+
+    def __init__(self, ttl: float = 300, negative_ttl: float = 10) -> None:
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries = {}
+        self._inflight = {}
+        self._prefetch_task = None
+        self.hits = 0
+        self.misses = 0
+
+    async def _lookup(self, host: str) -> list[str]:
+        loop = asyncio.get_running_loop()
+        try:
+            infos = await loop.getaddrinfo(host, None, type=socket.SOCK_STREAM)
+        except socket.gaierror:
+            self._entries[host] = (time.monotonic() + self.negative_ttl, [])
+            raise
+        addresses = list(dict.fromkeys(str(info[4][0]) for info in infos))
+        self._entries[host] = (time.monotonic() + self.ttl, addresses)
+        return addresses
+
+    async def resolve(self, host: str) -> list[str]:
+        if is_ip(host):
+            return [host]
+        entry = self._entries.get(host)
+        if entry and entry[0] > time.monotonic():
+            if not entry[1]:
+                raise socket.gaierror(socket.EAI_NONAME, f"cached resolve failure: {host}")
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        future = self._inflight.get(host)
+        if future is None:
+            future = asyncio.ensure_future(self._lookup(host))
+            self._inflight[host] = future
+            future.add_done_callback(lambda _: self._inflight.pop(host, None))
+        return await asyncio.shield(future)
+
+    def invalidate(self, host: str) -> None:
+        self._entries.pop(host, None)
+
+    async def prefetch(self, hosts: Iterable[str]) -> None:
+        targets = {h for h in hosts if h and not is_ip(h)}
+        results = await asyncio.gather(*(self.resolve(h) for h in targets), return_exceptions=True)
+        for host, result in zip(targets, results, strict=True):
+            if isinstance(result, BaseException):
+                logger.warning(f"预解析 {host} 失败: {result}")
+
+    def prefetch_in_background(self, hosts: Iterable[str]) -> None:
+        self._prefetch_task = asyncio.create_task(self.prefetch(list(hosts)))
+
+    async def stop(self) -> None:
+        if self._prefetch_task and not self._prefetch_task.done():
+            self._prefetch_task.cancel()
+            try:
+                await self._prefetch_task
+            except asyncio.CancelledError:
+                pass
+        self._prefetch_task = None
+
+    @property
+    def stats(self) -> dict[str, int | float]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+        }
+
+
+class CachedDNSBackend(httpcore.AnyIOBackend):
+    """建立 TCP 连接前先查 DNS 缓存, 依次尝试各地址; TLS 的 SNI 仍使用原 host"""
+
+    cache: DNSCache
+
+    def __init__(self, cache: DNSCache) -> None:
+        super().__init__()
+        self.cache = cache
+
+    async def connect_tcp(self, host: str, port: int, **kwargs) -> httpcore.AsyncNetworkStream:  # type: ignore[override]
+        try:
+            addresses = await self.cache.resolve(host)
+        except socket.gaierror as e:
+            raise httpcore.ConnectError(str(e)) from e
+        error: Exception | None = None
+        for address in addresses:
+            try:
+                return await super().connect_tcp(address, port, **kwargs)
+            except (httpcore.ConnectError, httpcore.ConnectTimeout) as e:
+                error = e
+        # 地址可能已变更, 下次重新解析
+        self.cache.invalidate(host)
+        raise error  # type: ignore
+
+
+dns_cache = DNSCache()
+
+
+# httpcore 异常 -> httpx 异常, 按异常类型的 MRO 取最具体的映射
+_EXCEPTION_MAP: dict[type[Exception], type[httpx.TransportError]] = {
+    httpcore.TimeoutException: httpx.TimeoutException,
+    httpcore.ConnectTimeout: httpx.ConnectTimeout,
+    httpcore.ReadTimeout: httpx.ReadTimeout,
+    httpcore.WriteTimeout: httpx.WriteTimeout,
+    httpcore.PoolTimeout: httpx.PoolTimeout,
+    httpcore.NetworkError: httpx.NetworkError,
+    httpcore.ConnectError: httpx.ConnectError,
+    httpcore.ReadError: httpx.ReadError,
+    httpcore.WriteError: httpx.WriteError,
+    httpcore.ProxyError: httpx.ProxyError,
+    httpcore.UnsupportedProtocol: httpx.UnsupportedProtocol,
+    httpcore.ProtocolError: httpx.ProtocolError,
+    httpcore.LocalProtocolError: httpx.LocalProtocolError,
+    httpcore.RemoteProtocolError: httpx.RemoteProtocolError,
+}
+
+
+@contextmanager
+def _map_exceptions() -> Iterator[None]:
+    try:
+        yield
+    except Exception as e:
+        mapped = next((_EXCEPTION_MAP[t] for t in type(e).__mro__ if t in _EXCEPTION_MAP), None)
+        if mapped is None:
+            raise
+        raise mapped(str(e)) from e
+
+
+class _ResponseStream(httpx.AsyncByteStream):
+    def __init__(self, stream: AsyncIterable[bytes]) -> None:
+        self._stream = stream
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        with _map_exceptions():
+            async for part in self._stream:
+                yield part
+
+    async def aclose(self) -> None:
+        if hasattr(self._stream, "aclose"):
+            await self._stream.aclose()
+
+
+class CachedDNSTransport(httpx.AsyncBaseTransport):
+    """使用 DNS 缓存网络后端的 httpx 传输层, 连接池参数同 httpx.AsyncHTTPTransport"""
+
+    def __init__(
+        self,
+        cache: DNSCache = dns_cache,
+        verify: bool = True,
+        http2: bool = False,
+        limits: httpx.Limits = httpx.Limits(max_connections=100, max_keepalive_connections=20),
+    ) -> None:
+        self._pool = httpcore.AsyncConnectionPool(
+            ssl_context=httpx.create_ssl_context(verify=verify),
+            max_connections=limits.max_connections,
+            max_keepalive_connections=limits.max_keepalive_connections,
+            keepalive_expiry=limits.keepalive_expiry,
+            http1=True,
+            http2=http2,
+            network_backend=CachedDNSBackend(cache),
+        )
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        core_request = httpcore.Request(
+            method=request.method,
+            url=httpcore.URL(
+                scheme=request.url.raw_scheme,
+                host=request.url.raw_host,
+                port=request.url.port,
+                target=request.url.raw_path,
+            ),
+            headers=request.headers.raw,
+            content=request.stream,  # type: ignore
+            extensions=request.extensions,
+        )
+        with _map_exceptions():
+            response = await self._pool.handle_async_request(core_request)
+        return httpx.Response(
+            status_code=response.status,
+            headers=response.headers,
+            stream=_ResponseStream(response.stream),  # type: ignore
+            extensions=response.extensions,
+        )
+
+    async def aclose(self) -> None:
+        await self._pool.aclose()
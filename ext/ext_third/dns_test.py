@@ -0,0 +1,47 @@
+import time
+import asyncio
+from collections.abc import AsyncIterator
+
+import httpx
+import pytest
+import pytest_asyncio
+
+from ext.ext_third.dns import DNSCache, CachedDNSTransport
+
+# 只存在于 DNS 缓存中的域名, 未经缓存解析时请求必然失败
+HOST = "dns-cache.invalid"
+
+
+async def _handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    await reader.readuntil(b"\r\n\r\n")
+    writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\nConnection: close\r\n\r\nok")
+    await writer.drain()
+    writer.close()
+
+
+@pytest_asyncio.fixture
+async def port() -> AsyncIterator[int]:
+    server = await asyncio.start_server(_handle, "127.0.0.1", 0)
+    async with server:
+        yield server.sockets[0].getsockname()[1]
+
+
+@pytest.mark.asyncio
+async def test_transport_uses_dns_cache(port: int) -> None:
+    cache = DNSCache()
+    cache._entries[HOST] = (time.monotonic() + 60, ["127.0.0.1"])
+    async with httpx.AsyncClient(transport=CachedDNSTransport(cache)) as client:
+        response = await client.get(f"http://{HOST}:{port}/")
+    assert response.status_code == 200
+    assert response.text == "ok"
+    assert cache.hits == 1
+
+
+@pytest.mark.asyncio
+async def test_transport_maps_connect_error() -> None:
+    cache = DNSCache()
+    # 缓存的解析失败
+    cache._entries[HOST] = (time.monotonic() + 60, [])
+    async with httpx.AsyncClient(transport=CachedDNSTransport(cache)) as client:
+        with pytest.raises(httpx.ConnectError):
+            await client.get(f"http://{HOST}/")
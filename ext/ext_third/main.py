@@ -0,0 +1,52 @@
+import asyncio
+from typing import override
+
+import httpx
+
+from config.default import RegisterExtensionConfig
+
+
+class ThirdConfig(RegisterExtensionConfig):
+    """三方服务 http 连接池, Third 未单独指定 limits/http2 时使用"""
+
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 30
+    # 需要安装 httpx[http2]
+    http2: bool = False
+    # 进程内 DNS 缓存
+    dns_ttl: float = 300
+    # 启动时后台预解析已注册 Third/API 的 host
+    dns_prefetch: bool = True
+
+    @property
+    def limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+    @override
+    async def register(self) -> None:
+        from ext.ext_third.dns import dns_cache
+        from ext.ext_third.base import Third, third_registry
+
+        Third.default_limits = self.limits
+        Third.default_http2 = self.http2
+        dns_cache.ttl = self.dns_ttl
+        hosts = set()
+        for third in list(third_registry):
+            third.open()
+            hosts.add(third.host)
+            hosts.update(api.host for api in third.apis if api.host)
+        if self.dns_prefetch:
+            dns_cache.prefetch_in_background(hosts)
+
+    @override
+    async def unregister(self) -> None:
+        from ext.ext_third.dns import dns_cache
+        from ext.ext_third.base import third_registry
+
+        await dns_cache.stop()
+        await asyncio.gather(*(third.aclose() for third in list(third_registry)))
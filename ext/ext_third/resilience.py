@@ -0,0 +1,301 @@
+"""三方请求容错: 熔断、重试、对冲请求"""
+
+from __future__ import annotations
+
+import time
+import random
+import asyncio
+import weakref
+from enum import unique
+from collections import deque
+from collections.abc import Callable, Iterable, Awaitable
+
+import httpx
+
+from core.types import StrEnum
+
+# 幂等方法才允许重试/对冲
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+RETRY_STATUS_CODES = frozenset({502, 503, 504})
+
+
+@unique
+class BreakerStateEnum(StrEnum):
+    """熔断器状态"""
+
+    closed = ("closed", "关闭")
+    open = ("open", "打开")
+    half_open = ("half_open", "半开")
+
+
+class CircuitOpenError(Exception):
+    """熔断器打开, 请求未发出"""
+
+
+class CircuitBreaker:
+    """基于最近 window 次调用的失败率/慢调用率熔断
+
+    打开 open_seconds 秒后进入半开状态, 放行 half_open_calls 个探测请求,
+    全部成功则关闭, 任一失败重新打开
+    """
+
+    name: str
+    window: int
+    min_calls: int
+    failure_rate: float
+    slow_call_duration: float | None
+    slow_call_rate: float
+    open_seconds: float
+    half_open_calls: int
+    _calls: deque[tuple[bool, bool]]  # (失败, 慢调用)
+    _state: BreakerStateEnum
+    _opened_at: float
+    _half_open_inflight: int
+    _half_open_succeeded: int
+    # 统计
+    opened_total: int
+    rejected_total: int
+
+    def __init__(
+        self,
+        name: str,
+        window: int = 50,
+        min_calls: int = 10,
+        failure_rate: float = 0.5,
+        slow_call_duration: float | None = None,
+        slow_call_rate: float = 0.8,
+        open_seconds: float = 30,
+        half_open_calls: int = 1,
+    ) -> None:
+        self.name = name
+        self.window = window
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_duration = slow_call_duration
+        self.slow_call_rate = slow_call_rate
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+        self._calls = deque(maxlen=window)
+        self._state = BreakerStateEnum.closed
+        self._opened_at = 0
+        self._half_open_inflight = 0
+        self._half_open_succeeded = 0
+        self.opened_total = 0
+        self.rejected_total = 0
+        breaker_registry.add(self)
+
+    @property
+    def state(self) -> BreakerStateEnum:
+        if self._state == BreakerStateEnum.open and time.monotonic() - self._opened_at >= self.open_seconds:
+            self._state = BreakerStateEnum.half_open
+            self._half_open_inflight = 0
+            self._half_open_succeeded = 0
+        return self._state
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == BreakerStateEnum.closed:
+            return True
+        if state == BreakerStateEnum.half_open and self._half_open_inflight < self.half_open_calls:
+            self._half_open_inflight += 1
+            return True
+        self.rejected_total += 1
+        return False
+
+    def record(self, failed: bool, duration: float) -> None:
+        slow = self.slow_call_duration is not None and duration >= self.slow_call_duration
+        if self._state == BreakerStateEnum.half_open:
+            if failed or slow:
+                self._open()
+                return
+            self._half_open_succeeded += 1
+            if self._half_open_succeeded >= self.half_open_calls:
+                self._state = BreakerStateEnum.closed
+                self._calls.clear()
+            return
+        if self._state == BreakerStateEnum.open:
+            return
+        self._calls.append((failed, slow))
+        total = len(self._calls)
+        if total < self.min_calls:
+            return
+        failures = sum(1 for f, _ in self._calls if f)
+        slows = sum(1 for _, s in self._calls if s)
+        if failures / total >= self.failure_rate or slows / total >= self.slow_call_rate:
+            self._open()
+
+    def _open(self) -> None:
+        self._state = BreakerStateEnum.open
+        self._opened_at = time.monotonic()
+        self._calls.clear()
+        self.opened_total += 1
+
+    @property
+    def snapshot(self) -> dict[str, str | int | float]:
+        total = len(self._calls)
+        return {
+            "name": self.name,
+            "state": self.state.value,
+            "calls": total,
+            "failure_rate": sum(1 for f, _ in self._calls if f) / total if total else 0.0,
+            "slow_call_rate": sum(1 for _, s in self._calls if s) / total if total else 0.0,
+            "opened_total": self.opened_total,
+            "rejected_total": self.rejected_total,
+        }
+
+
+class RetryPolicy:
+    """指数退避 + 全抖动重试, 仅用于幂等方法; 重试传输层错误(httpx.TransportError, 含超时)及指定状态码"""
+
+    attempts: int
+    backoff: float
+    max_backoff: float
+    status_codes: frozenset[int]
+
+    def __init__(
+        self,
+        attempts: int = 3,
+        backoff: float = 0.1,
+        max_backoff: float = 2,
+        status_codes: Iterable[int] = RETRY_STATUS_CODES,
+    ) -> None:
+        if attempts < 1:
+            raise ValueError("attempts must be >= 1")
+        self.attempts = attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.status_codes = frozenset(status_codes)
+
+    def delay(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2**attempt))  # noqa: S311
+
+
+class HedgePolicy:
+    """对冲请求: 首个请求超过 delay(未指定时为最近延迟的 quantile 分位)仍未返回时再发一个, 取先返回者"""
+
+    delay: float | None
+    quantile: float
+    min_samples: int
+    _latencies: deque[float]
+
+    def __init__(
+        self,
+        delay: float | None = None,
+        quantile: float = 0.95,
+        min_samples: int = 20,
+        window: int = 200,
+    ) -> None:
+        self.delay = delay
+        self.quantile = quantile
+        self.min_samples = min_samples
+        self._latencies = deque(maxlen=window)
+
+    def observe(self, duration: float) -> None:
+        self._latencies.append(duration)
+
+    def hedge_delay(self) -> float | None:
+        if self.delay is not None:
+            return self.delay
+        if len(self._latencies) < self.min_samples:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * self.quantile))]
+
+
+RawRequest = Callable[[dict], Awaitable[httpx.Response]]
+
+
+class ResiliencePolicy:
+    """Third/API 级容错策略, API 上的策略优先"""
+
+    breaker: CircuitBreaker | None
+    retry: RetryPolicy | None
+    hedge: HedgePolicy | None
+
+    def __init__(
+        self,
+        breaker: CircuitBreaker | None = None,
+        retry: RetryPolicy | None = None,
+        hedge: HedgePolicy | None = None,
+    ) -> None:
+        self.breaker = breaker
+        self.retry = retry
+        self.hedge = hedge
+
+    def _failed(self, raw: httpx.Response) -> bool:
+        return raw.status_code >= 500  # noqa: PLR2004
+
+    async def _attempt(self, request: RawRequest, request_kwargs: dict) -> httpx.Response:
+        if self.breaker and not self.breaker.allow():
+            raise CircuitOpenError(f"circuit breaker {self.breaker.name} is open")
+        probe = self.breaker is not None and self.breaker._state == BreakerStateEnum.half_open
+        start = time.monotonic()
+        try:
+            raw = await request(dict(request_kwargs))
+        except asyncio.CancelledError:
+            # 被对冲请求取消, 不计入统计; 半开状态归还探测名额
+            if probe and self.breaker._state == BreakerStateEnum.half_open:  # type: ignore
+                self.breaker._half_open_inflight -= 1  # type: ignore
+            raise
+        except Exception:
+            if self.breaker:
+                self.breaker.record(True, time.monotonic() - start)
+            raise
+        duration = time.monotonic() - start
+        if self.breaker:
+            self.breaker.record(self._failed(raw), duration)
+        if self.hedge and not self._failed(raw):
+            self.hedge.observe(duration)
+        return raw
+
+    async def _hedged(self, request: RawRequest, request_kwargs: dict) -> httpx.Response:
+        delay = self.hedge.hedge_delay() if self.hedge else None
+        if delay is None:
+            return await self._attempt(request, request_kwargs)
+        tasks = [asyncio.ensure_future(self._attempt(request, request_kwargs))]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done:
+                tasks.append(asyncio.ensure_future(self._attempt(request, request_kwargs)))
+            pending = set(tasks)
+            error: BaseException | None = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error  # type: ignore
+        finally:
+            # 调用方被取消或已有结果时取消其余请求, 等待其结束以归还半开探测名额并取走异常
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def execute(self, request: RawRequest, request_kwargs: dict) -> httpx.Response:
+        idempotent = request_kwargs["method"].upper() in IDEMPOTENT_METHODS
+        if not idempotent:
+            return await self._attempt(request, request_kwargs)
+        attempts = self.retry.attempts if self.retry else 1
+        for attempt in range(attempts):
+            last = attempt == attempts - 1
+            try:
+                raw = await self._hedged(request, request_kwargs)
+            except httpx.TransportError:
+                # 只重试连接/超时等传输层错误, 其余异常(含熔断)直接抛出
+                if last:
+                    raise
+            else:
+                if last or raw.status_code not in self.retry.status_codes:  # type: ignore
+                    return raw
+                await raw.aclose()
+            await asyncio.sleep(self.retry.delay(attempt))  # type: ignore
+        raise AssertionError("unreachable")
+
+
+# 全部熔断器, 用于监控
+breaker_registry: weakref.WeakSet[CircuitBreaker] = weakref.WeakSet()
+
+
+def breaker_states() -> list[dict[str, str | int | float]]:
+    return [breaker.snapshot for breaker in breaker_registry]
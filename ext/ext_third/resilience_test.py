@@ -0,0 +1,177 @@
+import asyncio
+from collections.abc import Callable, Awaitable
+
+import httpx
+import pytest
+
+from ext.ext_third.resilience import (
+    HedgePolicy,
+    RetryPolicy,
+    CircuitBreaker,
+    BreakerStateEnum,
+    CircuitOpenError,
+    ResiliencePolicy,
+)
+
+
+def test_breaker_opens_on_failure_rate() -> None:
+    breaker = CircuitBreaker("test", window=10, min_calls=4, failure_rate=0.5)
+    for failed in (False, True, False):
+        breaker.record(failed, 0.01)
+    # 未达到最少调用次数
+    assert breaker.state == BreakerStateEnum.closed
+    breaker.record(True, 0.01)
+    assert breaker.state == BreakerStateEnum.open
+    assert not breaker.allow()
+    assert breaker.snapshot["rejected_total"] == 1
+    assert breaker.snapshot["opened_total"] == 1
+
+
+def test_breaker_opens_on_slow_calls() -> None:
+    breaker = CircuitBreaker("test", min_calls=2, slow_call_duration=1, slow_call_rate=0.5)
+    breaker.record(False, 0.1)
+    breaker.record(False, 1.5)
+    assert breaker.state == BreakerStateEnum.open
+
+
+def test_breaker_half_open() -> None:
+    breaker = CircuitBreaker("test", min_calls=1, open_seconds=30, half_open_calls=1)
+    breaker.record(True, 0.01)
+    assert breaker.state == BreakerStateEnum.open
+    breaker._opened_at -= 30
+    assert breaker.state == BreakerStateEnum.half_open
+    # 只放行 half_open_calls 个探测请求
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record(True, 0.01)
+    assert breaker.state == BreakerStateEnum.open
+
+    breaker._opened_at -= 30
+    assert breaker.allow()
+    breaker.record(False, 0.01)
+    assert breaker.state == BreakerStateEnum.closed
+    assert breaker.snapshot["calls"] == 0
+
+
+def test_retry_delay_bounds() -> None:
+    policy = RetryPolicy(backoff=0.1, max_backoff=0.3)
+    for attempt in range(5):
+        assert 0 <= policy.delay(attempt) <= min(0.3, 0.1 * 2**attempt)
+    with pytest.raises(ValueError):
+        RetryPolicy(attempts=0)
+
+
+def test_hedge_delay() -> None:
+    assert HedgePolicy(delay=0.2).hedge_delay() == 0.2
+    policy = HedgePolicy(quantile=0.9, min_samples=10)
+    for i in range(9):
+        policy.observe(i / 100)
+    assert policy.hedge_delay() is None
+    policy.observe(0.09)
+    assert policy.hedge_delay() == 0.09
+
+
+def _request(
+    *results: httpx.Response | Exception,
+) -> tuple[Callable[[dict], Awaitable[httpx.Response]], list[dict]]:
+    """按顺序返回结果的请求函数, calls 记录调用次数"""
+    calls: list[dict] = []
+
+    async def request(kwargs: dict) -> httpx.Response:
+        calls.append(kwargs)
+        result = results[len(calls) - 1]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    return request, calls
+
+
+@pytest.mark.asyncio
+async def test_retry_transport_error_and_status() -> None:
+    policy = ResiliencePolicy(retry=RetryPolicy(attempts=3, backoff=0))
+    request, calls = _request(httpx.ConnectError("boom"), httpx.Response(503), httpx.Response(200))
+    raw = await policy.execute(request, {"method": "GET"})
+    assert raw.status_code == 200
+    assert len(calls) == 3
+
+
+@pytest.mark.asyncio
+async def test_retry_exhausted_returns_last_response() -> None:
+    policy = ResiliencePolicy(retry=RetryPolicy(attempts=2, backoff=0))
+    request, calls = _request(httpx.Response(503), httpx.Response(502))
+    raw = await policy.execute(request, {"method": "GET"})
+    assert raw.status_code == 502
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_no_retry() -> None:
+    policy = ResiliencePolicy(retry=RetryPolicy(attempts=3, backoff=0))
+    # 非幂等方法不重试
+    request, calls = _request(httpx.ConnectError("boom"))
+    with pytest.raises(httpx.ConnectError):
+        await policy.execute(request, {"method": "POST"})
+    assert len(calls) == 1
+    # 非传输层错误不重试
+    request, calls = _request(ValueError("bad"))
+    with pytest.raises(ValueError):
+        await policy.execute(request, {"method": "GET"})
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_breaker_rejects_before_request() -> None:
+    breaker = CircuitBreaker("test", min_calls=1)
+    policy = ResiliencePolicy(breaker=breaker, retry=RetryPolicy(attempts=3, backoff=0))
+    request, calls = _request(httpx.Response(500))
+    assert (await policy.execute(request, {"method": "GET"})).status_code == 500
+    with pytest.raises(CircuitOpenError):
+        await policy.execute(request, {"method": "GET"})
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_hedge_cancels_slow_request() -> None:
+    policy = ResiliencePolicy(hedge=HedgePolicy(delay=0.01))
+    cancelled = asyncio.Event()
+    calls = 0
+
+    async def request(kwargs: dict) -> httpx.Response:
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+        return httpx.Response(200)
+
+    raw = await asyncio.wait_for(policy.execute(request, {"method": "GET"}), timeout=1)
+    assert raw.status_code == 200
+    assert calls == 2
+    # 返回前已取消并等待慢请求结束
+    assert cancelled.is_set()
+
+
+@pytest.mark.asyncio
+async def test_hedge_returns_half_open_probe_on_cancel() -> None:
+    breaker = CircuitBreaker("test", min_calls=1, half_open_calls=1)
+    breaker.record(True, 0.01)
+    breaker._opened_at -= breaker.open_seconds
+    policy = ResiliencePolicy(breaker=breaker, hedge=HedgePolicy(delay=10))
+
+    async def request(kwargs: dict) -> httpx.Response:
+        await asyncio.sleep(10)
+        return httpx.Response(200)
+
+    task = asyncio.ensure_future(policy.execute(request, {"method": "GET"}))
+    await asyncio.sleep(0.01)
+    assert breaker._half_open_inflight == 1
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    # 调用方被取消后归还探测名额
+    assert breaker.state == BreakerStateEnum.half_open
+    assert breaker.allow()
@@ -4,9 +4,13 @@ import datetime
 import warnings
 from typing import Any, Protocol
 from zoneinfo import ZoneInfo
+from contextlib import contextmanager
+from collections import defaultdict
+from contextvars import ContextVar
 from urllib.parse import urlparse
-from collections.abc import Callable
+from collections.abc import Callable, Iterable, Iterator
 
+from pydantic import BaseModel
 from tortoise import fields, timezone, validators
 from tortoise.models import Model
 from tortoise.timezone import get_use_tz, get_default_timezone
@@ -22,6 +26,68 @@ class StorageMixin(Protocol):
         expire: int | None = None,
     ) -> tuple[bool, str]: ...
 
+    def get_full_paths(
+        self,
+        paths: Iterable[str],
+        expire: int | None = None,
+    ) -> dict[str, tuple[bool, str]]: ...
+
+
+# (存储, 有效期) -> 待签名的文件 key
+DeferredFileKeys = dict[tuple[StorageMixin, int | None], set[str]]
+
+# 批量签名模式下 FileField 保留原始 key, 由 sign_deferred_file_urls 统一签名
+_deferred_file_keys: ContextVar[DeferredFileKeys | None] = ContextVar("deferred_file_keys", default=None)
+
+
+@contextmanager
+def defer_file_urls() -> Iterator[DeferredFileKeys]:
+    collected: DeferredFileKeys = defaultdict(set)
+    token = _deferred_file_keys.set(collected)
+    try:
+        yield collected
+    finally:
+        _deferred_file_keys.reset(token)
+
+
+def sign_deferred_file_urls(records: Iterable[BaseModel], collected: DeferredFileKeys) -> None:
+    """批量签名收集到的 key, 并替换 records(含嵌套 schema)中 FileField 字段的值"""
+    urls: dict[tuple[StorageMixin, int | None], dict[str, str]] = {}
+    for (storage, expire), keys in collected.items():
+        signed = storage.get_full_paths(keys, expire)
+        for is_success, url_or_error in signed.values():
+            if not is_success:
+                raise ValueError(url_or_error)
+        urls[(storage, expire)] = {k: v[1] for k, v in signed.items()}
+
+    file_fields_cache: dict[type, list[tuple[str, FileField]]] = {}
+
+    def replace(value: Any) -> None:  # ruff: noqa: ANN401
+        if isinstance(value, list | tuple | set):
+            for i in value:
+                replace(i)
+            return
+        if not isinstance(value, BaseModel):
+            return
+        schema = type(value)
+        if schema not in file_fields_cache:
+            orig_model = schema.model_config.get("orig_model")
+            file_fields_cache[schema] = [
+                (name, field)
+                for name, field in (orig_model._meta.fields_map.items() if orig_model else [])
+                if isinstance(field, FileField) and name in schema.model_fields
+            ]
+        for name, field in file_fields_cache[schema]:
+            key = getattr(value, name)
+            url = urls.get((field._file_storage, field._expire), {}).get(key) if key else None
+            if url:
+                setattr(value, name, url)
+        for name in schema.model_fields:
+            replace(getattr(value, name))
+
+    for record in records:
+        replace(record)
+
 
 class FileField(fields.CharField):
     """
@@ -62,11 +128,15 @@ class FileField(fields.CharField):
     def to_python_value(self, value: str) -> str | None:
         if not value or value.startswith("http") or "." not in value:
             return value
+        deferred = _deferred_file_keys.get()
+        if deferred is not None:
+            deferred[(self._file_storage, self._expire)].add(value)
+            return value
         try:
-            is_success, url_or_error = self._file_storage.get_full_path(
-                value,
+            is_success, url_or_error = self._file_storage.get_full_paths(
+                [value],
                 self._expire,
-            )
+            )[value]
         except Exception as e:
             raise ValueError(
                 f"Obtain file from storage {self._file_storage} failed with exception {e}",
@@ -85,7 +85,7 @@ class TimeStampModel(Model):
     async def delete_by_ids(cls, ids: list[int | str | uuid.UUID]) -> int:
         """batch fake delete"""
         now = datetime.datetime.now(
-            tz=self._meta.fields_map["deleted_at"].timezone,  # type: ignore
+            tz=cls._meta.fields_map["deleted_at"].timezone,  # type: ignore
         )
         return await cls.filter(id__in=ids).update(deleted_at=now, updated_at=now)
 
@@ -1,19 +1,32 @@
 import re
 import uuid
-from typing import TypeVar
+import base64
+import asyncio
+import hashlib
+import binascii
+from typing import Any, TypeVar
 from collections import defaultdict
+from collections.abc import Awaitable
 
+import orjson
 from fastapi import Body, Query, Depends
 from pydantic import BaseModel
 from tortoise.models import Model
 from tortoise.queryset import QuerySet
 from tortoise.exceptions import IntegrityError
 from tortoise.expressions import Q
+from starlette.concurrency import run_in_threadpool
+from tortoise.backends.base.client import TransactionalDBClient
 from tortoise.contrib.pydantic.base import PydanticModel
 
 from core.types import ApiException
-from core.schema import CRUDPager, paginate
-from core.response import Resp
+from config.main import local_configs
+from core.schema import CRUDPager, CountModeEnum, paginate
+from core.response import Resp, PageData
+from enhance.epydantic import create_sub_fields_model, prewarm_sub_fields_models
+from ext.ext_redis.keys import GeneralCacheKey
+from ext.ext_redis.broadcast import invalidation_bus
+from ext.ext_tortoise.base.fields import defer_file_urls, sign_deferred_file_urls
 
 unique_error_msg_key_regex = re.compile(r"'(.*?)'")
 
@@ -30,17 +43,72 @@ def pagination_factory(
     list_schema: type[PydanticModel],
     max_limit: int | None = None,
     param_type: type[Query] | type[Body] = Query,  # type: ignore
+    cursor_pagination: bool = False,
+    count_mode: CountModeEnum = CountModeEnum.exact,
+    count_cache_ttl: int = 30,
+    prewarm_fields: list[set[str]] | None = None,
 ) -> CRUDPager:
-    return Depends(paginate(db_model, search_fields, order_fields, list_schema, max_limit, param_type))  # type: ignore
-
-
-async def get_all_obj(
-    queryset: QuerySet[ModelType],  # type: ignore
+    if prewarm_fields:
+        # 与 paginate 一致, selected_fields 总是包含 id
+        prewarm_sub_fields_models(list_schema, [{*i, "id"} for i in prewarm_fields])
+    return Depends(
+        paginate(
+            db_model,
+            search_fields,
+            order_fields,
+            list_schema,
+            max_limit,
+            param_type,
+            cursor_pagination,
+            count_mode,
+            count_cache_ttl,
+        ),
+    )  # type: ignore
+
+
+async def _cached_count(queryset: QuerySet[ModelType], ttl: int) -> int:
+    count_query = queryset.count()
+    digest = hashlib.md5(count_query.sql(params_inline=True).encode()).hexdigest()  # noqa: S324
+    key = GeneralCacheKey.QueryCount.format(table=queryset.model._meta.db_table, digest=digest)
+    async with local_configs.extensions.redis.instance as r:
+        total = await r.get(key)
+        if total is not None:
+            return int(total)
+        total = await count_query
+        await r.set(key, total, ex=ttl)
+    return total
+
+
+async def _estimate_count(queryset: QuerySet[ModelType]) -> int:
+    db = queryset._choose_db()
+    if db.capabilities.dialect != "mysql":
+        return await queryset.count()
+    # 取驱动表的预估扫描行数 * 过滤比例
+    plan = await db.execute_query_dict(f"EXPLAIN {queryset.sql(params_inline=True)}")
+    if not plan or plan[0].get("rows") is None:
+        return await queryset.count()
+    return int(plan[0]["rows"] * float(plan[0].get("filtered") or 100) / 100)
+
+
+async def count_obj(queryset: QuerySet[ModelType], count_mode: CountModeEnum, cache_ttl: int = 30) -> int | None:
+    match count_mode:
+        case CountModeEnum.none:
+            return None
+        case CountModeEnum.cached:
+            return await _cached_count(queryset, cache_ttl)
+        case CountModeEnum.estimate:
+            return await _estimate_count(queryset)
+        case _:
+            return await queryset.count()
+
+
+def _filter_queryset(
+    queryset: QuerySet[ModelType],
     pagination: CRUDPager,
     *args: Q,
     **kwargs: dict,
-) -> tuple[list, int]:  # type: ignore
-    queryset = queryset.filter(*args).filter(**kwargs).order_by(*pagination.order_by)
+) -> QuerySet[ModelType]:
+    queryset = queryset.filter(*args).filter(**kwargs)
 
     search = pagination.search
     if search and pagination.available_search_fields:
@@ -51,19 +119,138 @@ async def get_all_obj(
             )
         q_expression = Q(*sub_q_exps, join_type=Q.OR)
         queryset = queryset.filter(q_expression)
+    return queryset
+
+
+async def _from_queryset(list_schema: type[PydanticModel], queryset: QuerySet[ModelType]) -> list:
+    """文件字段的 url 在全部数据加载后统一签名, 不在每行数据转换时逐个签名"""
+    with defer_file_urls() as collected:
+        data = await list_schema.from_queryset(queryset)  # type: ignore
+    if collected:
+        await run_in_threadpool(sign_deferred_file_urls, data, collected)
+    return data
+
+
+async def _page_and_count(
+    queryset: QuerySet[ModelType],
+    page: Awaitable[list],
+    count: Awaitable[int | None],
+) -> tuple[list, int | None]:
+    """分页查询与 COUNT 各取一个连接池连接并发执行; 事务内共用同一个连接, 不能并发, 依次执行"""
+    if isinstance(queryset._choose_db(), TransactionalDBClient):
+        return await page, await count
+    data, total = await asyncio.gather(page, count)
+    return data, total
+
 
-    list_schema = pagination.list_schema
+def _get_list_schema(pagination: CRUDPager) -> type[PydanticModel]:
     if pagination.selected_fields:
-        list_schema = create_sub_fields_model(  # type: ignore
+        return create_sub_fields_model(  # type: ignore
             pagination.list_schema,
             pagination.selected_fields,
         )
+    return pagination.list_schema  # type: ignore
 
-    data = await list_schema.from_queryset(  # type: ignore
-        queryset.offset(pagination.offset).limit(pagination.limit),
+
+async def get_all_obj(
+    queryset: QuerySet[ModelType],  # type: ignore
+    pagination: CRUDPager,
+    *args: Q,
+    **kwargs: dict,
+) -> tuple[list, int | None]:  # type: ignore
+    queryset = _filter_queryset(queryset, pagination, *args, **kwargs).order_by(*pagination.order_by)
+
+    list_schema = _get_list_schema(pagination)
+    return await _page_and_count(
+        queryset,
+        _from_queryset(
+            list_schema,
+            queryset.offset(pagination.offset).limit(pagination.limit),
+        ),
+        count_obj(queryset, pagination.count_mode, pagination.count_cache_ttl),
     )
-    total = await queryset.count()
-    return data, total
+
+
+def cursor_order_by(db_model: type[Model], order_by: set[str]) -> list[str]:
+    """游标分页的排序字段, 字段名排序保证每次请求一致, 末尾追加主键保证唯一"""
+    pk_attr = db_model._meta.pk_attr
+    fields = sorted((i for i in order_by if i.lstrip("-") != pk_attr), key=lambda i: i.lstrip("-"))
+    fields.append(f"-{pk_attr}" if f"-{pk_attr}" in order_by else pk_attr)
+    return fields
+
+
+def encode_cursor(values: list[Any]) -> str:
+    return base64.urlsafe_b64encode(orjson.dumps(values, default=str)).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, db_model: type[Model], order_by: list[str]) -> list[Any]:
+    try:
+        values = orjson.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, ValueError) as e:
+        raise ApiException("游标无效") from e
+    if not isinstance(values, list) or len(values) != len(order_by):
+        raise ApiException("游标与排序字段不匹配")
+    fields_map = db_model._meta.fields_map
+    try:
+        return [fields_map[i.lstrip("-")].to_python_value(v) for i, v in zip(order_by, values, strict=True)]
+    except (TypeError, ValueError) as e:
+        raise ApiException("游标无效") from e
+
+
+def seek_q(order_by: list[str], values: list[Any]) -> Q:
+    """(k1, k2, id) > (v1, v2, vid) 展开为 OR, 支持各字段升降序混合"""
+    q_exps = []
+    for i, field in enumerate(order_by):
+        lookup = f"{field[1:]}__lt" if field.startswith("-") else f"{field}__gt"
+        equals = {order_by[j].lstrip("-"): values[j] for j in range(i)}
+        q_exps.append(Q(**equals, **{lookup: values[i]}))
+    return Q(*q_exps, join_type=Q.OR)
+
+
+async def get_all_obj_by_cursor(
+    queryset: QuerySet[ModelType],  # type: ignore
+    pagination: CRUDPager,
+    *args: Q,
+    **kwargs: dict,
+) -> tuple[list, int | None, str | None]:  # type: ignore
+    """游标分页, 通过 WHERE 定位起点代替 OFFSET 跳过前序数据, 返回 (数据, 总数, 下一页游标)"""
+    db_model = queryset.model
+    order_by = cursor_order_by(db_model, pagination.order_by)
+    queryset = _filter_queryset(queryset, pagination, *args, **kwargs)
+
+    page_queryset = queryset.order_by(*order_by)
+    if pagination.cursor:
+        page_queryset = page_queryset.filter(seek_q(order_by, decode_cursor(pagination.cursor, db_model, order_by)))
+    else:
+        page_queryset = page_queryset.offset(pagination.offset)
+
+    list_schema = _get_list_schema(pagination)
+    # 多取一条判断是否还有下一页
+    data, total = await _page_and_count(
+        queryset,
+        _from_queryset(
+            list_schema,
+            page_queryset.limit(pagination.limit + 1),
+        ),
+        count_obj(queryset, pagination.count_mode, pagination.count_cache_ttl),
+    )
+    next_cursor = None
+    if len(data) > pagination.limit:
+        data = data[: pagination.limit]
+        next_cursor = encode_cursor([getattr(data[-1], i.lstrip("-")) for i in order_by])
+    return data, total, next_cursor
+
+
+async def broadcast_invalidation(
+    db_model: type[Model],
+    pks: list[str | uuid.UUID | int] | set[str | uuid.UUID | int],
+) -> None:
+    """Meta.invalidation_topic 声明了本地缓存的模型, 变更后通知所有 worker 清理"""
+    topic = getattr(db_model.Meta, "invalidation_topic", None)
+    if not topic:
+        return
+    async with local_configs.extensions.redis.instance as r:
+        await invalidation_bus.publish(r, topic, [str(pk) for pk in pks])
 
 
 async def obj_prefetch_fields(obj: Model, schema: type[PydanticModelType]) -> Model:
@@ -90,20 +277,17 @@ async def kwargs_clean(
 
     simple_data = {}
     m2m_fields_data: dict = defaultdict(list)
+    # (关联模型, 字段) -> 待校验的值, 同一模型只查询一次
+    lookups: dict[tuple[type[Model], str], list] = defaultdict(list)
+    m2m_refs: dict[str, list] = {}
 
     for key in data:
         if key not in fields_map:
             continue
         if key in fk_fields:
             if data[key]:
-                field = fields_map[key.split("_id")[0]]
-                obj = await field.related_model.get_or_none(  # type: ignore
-                    **{field.to_field: data[key]},  # type: ignore
-                )
-                if not obj:
-                    raise ApiException(
-                        f"ID为{data[key]}的{field.description}不存在",
-                    )
+                field = fields_map[key.removesuffix("_id")]
+                lookups[(field.related_model, field.to_field)].append(data[key])  # type: ignore
             simple_data[key] = data[key]
             continue
 
@@ -111,25 +295,41 @@ async def kwargs_clean(
             if data[key] is None:
                 m2m_fields_data[key] = None  # type: ignore
                 continue
-            m2m_fields_data[key] = []
-            field = fields_map[key]
-            model = field.related_model  # type: ignore
+            related_model = fields_map[key].related_model  # type: ignore
             for related_id in data[key]:
-                if isinstance(related_id, Model):
-                    m2m_fields_data[key].append(obj)
-                    continue
-                obj = await model.get_or_none(
-                    **{model._meta.pk_attr: related_id},
-                )
-                if not obj:
-                    raise ApiException(
-                        f"id为{related_id}的{model._meta.table_description}不存在",
-                    )
-                m2m_fields_data[key].append(obj)
+                if not isinstance(related_id, Model):
+                    lookups[(related_model, related_model._meta.pk_attr)].append(related_id)
+            m2m_refs[key] = data[key]
             continue
 
         simple_data[key] = data[key]
 
+    found: dict[tuple[type[Model], str], dict] = {}
+    for (related_model, attr), values in lookups.items():
+        to_python = related_model._meta.fields_map[attr].to_python_value
+        unique_values = list(dict.fromkeys(to_python(v) for v in values))
+        objs = await related_model.filter(**{f"{attr}__in": unique_values})
+        found[(related_model, attr)] = {getattr(obj, attr): obj for obj in objs}
+        missing = [v for v in unique_values if v not in found[(related_model, attr)]]
+        if missing:
+            raise ApiException(
+                f"ID为{', '.join(map(str, missing))}的{related_model._meta.table_description}不存在",
+            )
+
+    for key, refs in m2m_refs.items():
+        related_model = fields_map[key].related_model  # type: ignore
+        pk_attr = related_model._meta.pk_attr
+        to_python = related_model._meta.fields_map[pk_attr].to_python_value
+        objs = {}
+        for related_id in refs:
+            obj = (
+                related_id
+                if isinstance(related_id, Model)
+                else found[(related_model, pk_attr)][to_python(related_id)]
+            )
+            objs[obj.pk] = obj
+        m2m_fields_data[key] = list(objs.values())
+
     return simple_data, m2m_fields_data
 
 
@@ -210,6 +410,7 @@ async def update_obj(
             continue
         await getattr(obj, k).add(*v)
     await obj.refresh_from_db()
+    await broadcast_invalidation(db_model, [obj.pk])
     return obj  # type: ignore
 
 
@@ -220,6 +421,15 @@ async def list_view(
 ) -> Resp:
     if pager.selected_fields:
         queryset = queryset.only(*pager.selected_fields)
+    if pager.cursor_enabled:
+        data, total, next_cursor = await get_all_obj_by_cursor(
+            queryset=queryset.distinct(),
+            pagination=pager,
+            **filter.model_dump(exclude_unset=True, exclude_none=True),
+        )
+        return Resp(
+            data=PageData(records=data, total_count=total, pager=pager, next_cursor=next_cursor),  # type: ignore
+        )
     data, total = await get_all_obj(
         queryset=queryset.distinct(),
         pagination=pager,
@@ -277,6 +487,7 @@ async def delete_view(id: str | uuid.UUID | int, queryset: QuerySet[ModelType])
         ).delete()
     if r < 1:
         return Resp.fail(message=f"{db_model_label}不存在或已被删除")
+    await broadcast_invalidation(db_model, [id])
     return Resp(data=DeleteResp(deleted=r))
 
 
@@ -294,4 +505,5 @@ async def batch_delete_view(
         ).delete()
     if r < 1:
         return Resp.fail(message=f"{db_model_label}不存在或已被删除")
+    await broadcast_invalidation(db_model, ids)
     return Resp(data=DeleteResp(deleted=r))
@@ -0,0 +1,73 @@
+import asyncio
+from datetime import UTC, datetime
+from unittest.mock import Mock
+
+import pytest
+from tortoise.backends.base.client import BaseDBAsyncClient, TransactionalDBClient
+
+from core.types import ApiException
+from ext.ext_tortoise.curd import (
+    seek_q,
+    decode_cursor,
+    encode_cursor,
+    _page_and_count,
+    cursor_order_by,
+)
+from ext.ext_tortoise.models.second import SecondTable1
+
+
+def test_cursor_order_by_appends_pk() -> None:
+    assert cursor_order_by(SecondTable1, {"b", "-a"}) == ["-a", "b", "id"]
+    assert cursor_order_by(SecondTable1, {"-id", "a"}) == ["a", "-id"]
+    assert cursor_order_by(SecondTable1, set()) == ["id"]
+
+
+def test_cursor_round_trip() -> None:
+    order_by = ["-created_at", "a", "id"]
+    created_at = datetime(2024, 1, 2, 3, 4, 5, tzinfo=UTC)
+    cursor = encode_cursor([created_at, "x", 3])
+    assert "=" not in cursor
+    values = decode_cursor(cursor, SecondTable1, order_by)
+    assert values[1:] == ["x", 3]
+    assert values[0] == created_at
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "!!!",  # 非 base64
+        encode_cursor({"a": "x", "id": 1}),  # 非列表
+        encode_cursor(["x"]),  # 长度与排序字段不一致
+        encode_cursor(["x", "not-int"]),  # 值无法转换为字段类型
+    ],
+)
+def test_decode_cursor_invalid(cursor: str) -> None:
+    with pytest.raises(ApiException):
+        decode_cursor(cursor, SecondTable1, ["a", "id"])
+
+
+def test_seek_q_mixed_direction() -> None:
+    q = seek_q(["-a", "b", "id"], ["x", "y", 3])
+    assert q.join_type == "OR"
+    assert [child.filters for child in q.children] == [
+        {"a__lt": "x"},
+        {"a": "x", "b__gt": "y"},
+        {"a": "x", "b": "y", "id__gt": 3},
+    ]
+
+
+@pytest.mark.parametrize("client_cls, concurrent", [(BaseDBAsyncClient, True), (TransactionalDBClient, False)])
+@pytest.mark.asyncio
+async def test_page_and_count_in_transaction(client_cls: type, concurrent: bool) -> None:
+    events = []
+
+    async def query(name: str) -> str:
+        events.append(f"{name} start")
+        await asyncio.sleep(0.01)
+        events.append(f"{name} end")
+        return name
+
+    queryset = Mock(_choose_db=Mock(return_value=Mock(spec=client_cls)))
+    assert await _page_and_count(queryset, query("page"), query("count")) == ("page", "count")
+    # 事务连接上不能并发执行两条查询
+    assert (events[1] == "count start") is concurrent
@@ -7,6 +7,8 @@ from constant.regex import EMAIL_REGEX, PHONE_REGEX_CN, ACCOUNT_USERNAME_REGEX
 from ext.ext_tortoise import enums
 from ext.ext_redis.keys import UserCenterKey
 from ext.ext_tortoise.main import ConnectionNameEnum
+from ext.ext_redis.tracking import tracking_cache
+from ext.ext_redis.broadcast import InvalidationTopicEnum, invalidation_bus
 from ext.ext_tortoise.base.fields import FileField
 from ext.ext_tortoise.base.models import (
     BaseModel,
@@ -110,11 +112,12 @@ class Account(BaseModel):
         apis: list[str],
         conn_name: ConnectionNameEnum = ConnectionNameEnum.user_center,
     ) -> bool:
-        # OR
-        async with local_configs.extensions.redis.instance as r:
-            result = await r.smismember(
-                name=UserCenterKey.AccountApiPermissionSet.format(uuid=str(self.id)),  # type: ignore
-                values=apis,
+        # OR, 权限集合允许读副本
+        async with local_configs.extensions.redis.read_instance as r:
+            result = await tracking_cache.smismember(
+                r,
+                UserCenterKey.AccountApiPermissionSet.format(uuid=str(self.id)),  # type: ignore
+                apis,
             )
         if 1 in result:
             return True
@@ -134,7 +137,12 @@ class Account(BaseModel):
                         UserCenterKey.AccountApiPermissionSet.format(uuid=str(self.id)),  # type: ignore
                         *perms,  # type: ignore
                     )
-                await pipe.execute()
+                version_key = UserCenterKey.AccountApiPermissionVersion.format(uuid=str(self.id))
+                pipe.incr(version_key)
+                pipe.expire(version_key, local_configs.server.local_cache.permission_version_ttl)
+                *_, version, _ = await pipe.execute()
+            # 通知各 worker 淘汰低于该版本的本地权限集合
+            await invalidation_bus.publish(r, InvalidationTopicEnum.permission.value, [f"{self.id}:{version}"])
 
     async def get_permission_codes(self) -> list[str]:
         """获取用户的全部permission codes
@@ -196,6 +204,8 @@ class Account(BaseModel):
             ("email", "deleted_at"),
         )
         manager = NotDeletedManager()
+        # 变更时广播失效 api.depend 中的账户缓存
+        invalidation_topic = InvalidationTopicEnum.account.value
         unique_error_messages = {
             "account.uid_account_username_4f1849": "用户名已存在",
             "account.uid_account_phone_9b9e7e": "手机号已存在",
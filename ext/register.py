@@ -2,6 +2,7 @@ from pydantic import BaseModel
 
 from ext.ext_oss.main import OssConfig
 from ext.ext_redis.main import RedisConfig
+from ext.ext_third.main import ThirdConfig
 from ext.ext_tortoise.main import TortoiseConfig
 
 
@@ -12,6 +13,7 @@ class ExtensionRegistry(BaseModel):
 
     redis: RedisConfig
     oss: OssConfig
+    third: ThirdConfig = ThirdConfig()
     # relation: TortoiseConfig
     rdb_user_center: TortoiseConfig
     rdb_second: TortoiseConfig
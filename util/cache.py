@@ -0,0 +1,56 @@
+from typing import Any
+
+from cachetools import LRUCache, TTLCache, TLRUCache
+
+
+class CacheStatsMixin:
+    """命中/未命中/淘汰计数, 命中统计仅针对 get()"""
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0  # 容量满被淘汰
+    expirations: int = 0  # 过期被清理
+
+    def get(self, key: Any, default: Any = None) -> Any:  # ruff: noqa: ANN401
+        try:
+            value = self[key]  # type: ignore
+        except KeyError:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def popitem(self) -> tuple[Any, Any]:
+        item = super().popitem()  # type: ignore
+        self.evictions += 1
+        return item
+
+    def expire(self, time: float | None = None) -> list:
+        expired = super().expire(time)  # type: ignore
+        self.expirations += len(expired)
+        return expired
+
+    @property
+    def stats(self) -> dict[str, int | float]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self),  # type: ignore
+            "maxsize": self.maxsize,  # type: ignore
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_ratio": self.hits / total if total else 0.0,
+        }
+
+
+class StatsTTLCache(CacheStatsMixin, TTLCache):
+    """带统计的 TTLCache"""
+
+
+class StatsTLRUCache(CacheStatsMixin, TLRUCache):
+    """带统计的 TLRUCache"""
+
+
+class StatsLRUCache(CacheStatsMixin, LRUCache):
+    """带统计的 LRUCache, 指定 getsizeof 时 maxsize 为容量上限"""
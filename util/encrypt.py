@@ -1,8 +1,13 @@
 import hmac
+import time
 import base64
+import asyncio
 import secrets
-from typing import Any
-from collections.abc import Mapping
+import multiprocessing
+from typing import Any, Literal
+from functools import lru_cache
+from collections.abc import Mapping, Sequence
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
 
 import orjson
 from jose import jwt, constants
@@ -207,10 +212,114 @@ class SignAuth:
         return HashUtilB64.hmac_sha256_encode_b64(self.private_key, data_str)
 
 
+@lru_cache(maxsize=8)
+def _crypt_context(config: str) -> CryptContext:
+    return CryptContext.from_string(config)
+
+
+def _run_password_task(config: str, method: str, submitted_at: float, *args: str) -> tuple[Any, float, float]:
+    """在进程/线程池中执行, 返回 (结果, 排队秒数, 执行秒数)"""
+    started_at = time.time()
+    result = getattr(_crypt_context(config), method)(*args)
+    return result, started_at - submitted_at, time.time() - started_at
+
+
 class PasswordUtil:
-    """密码工具."""
+    """密码工具.
+
+    哈希计算耗时较长(bcrypt 12 轮约 200ms), 异步代码中使用 a 开头的方法, 在独立的进程/线程池中执行
+    """
 
     pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    # 传给进程池的配置串, configure 时生成一次
+    _context_string: str = pwd_context.to_string()
+    executor_type: Literal["process", "thread"] = "process"
+    max_workers: int = 2
+    _executor: Executor | None = None
+    # 统计
+    submitted: int = 0
+    completed: int = 0
+    failed: int = 0
+    wait_seconds_total: float = 0
+    wait_seconds_max: float = 0
+    run_seconds_total: float = 0
+
+    @classmethod
+    def configure(
+        cls,
+        schemes: Sequence[str] = ("bcrypt",),
+        bcrypt_rounds: int = 12,
+        scheme_options: Mapping[str, Any] | None = None,
+        executor: Literal["process", "thread"] = "process",
+        max_workers: int = 2,
+    ) -> None:
+        """schemes[0] 用于新哈希, 其余方案及低于 bcrypt_rounds 的 bcrypt 哈希在校验时需要升级"""
+        cls.pwd_context = CryptContext(
+            schemes=list(schemes),
+            deprecated="auto",
+            bcrypt__rounds=bcrypt_rounds,
+            bcrypt__min_rounds=bcrypt_rounds,
+            **(scheme_options or {}),
+        )
+        cls._context_string = cls.pwd_context.to_string()
+        cls.shutdown()
+        cls.executor_type = executor
+        cls.max_workers = max_workers
+
+    @classmethod
+    def executor(cls) -> Executor:
+        if cls._executor is None:
+            if cls.executor_type == "process":
+                # 在已有线程的 worker 进程中 fork 可能死锁, 由 forkserver 启动子进程
+                cls._executor = ProcessPoolExecutor(
+                    max_workers=cls.max_workers,
+                    mp_context=multiprocessing.get_context("forkserver"),
+                )
+            else:
+                cls._executor = ThreadPoolExecutor(max_workers=cls.max_workers, thread_name_prefix="password")
+        return cls._executor
+
+    @classmethod
+    def shutdown(cls) -> None:
+        if cls._executor is not None:
+            cls._executor.shutdown(wait=False, cancel_futures=True)
+            cls._executor = None
+
+    @classmethod
+    async def _run(cls, method: str, *args: str) -> Any:  # noqa: ANN401
+        cls.submitted += 1
+        loop = asyncio.get_running_loop()
+        try:
+            result, waited, elapsed = await loop.run_in_executor(
+                cls.executor(),
+                _run_password_task,
+                cls._context_string,
+                method,
+                time.time(),
+                *args,
+            )
+        except Exception:
+            cls.failed += 1
+            raise
+        cls.completed += 1
+        cls.wait_seconds_total += waited
+        cls.wait_seconds_max = max(cls.wait_seconds_max, waited)
+        cls.run_seconds_total += elapsed
+        return result
+
+    @classmethod
+    def metrics(cls) -> dict[str, int | float]:
+        done = cls.completed or 1
+        return {
+            "executor": cls.executor_type,  # type: ignore
+            "max_workers": cls.max_workers,
+            "pending": cls.submitted - cls.completed - cls.failed,
+            "completed": cls.completed,
+            "failed": cls.failed,
+            "wait_seconds_avg": cls.wait_seconds_total / done,
+            "wait_seconds_max": cls.wait_seconds_max,
+            "run_seconds_avg": cls.run_seconds_total / done,
+        }
 
     @classmethod
     def verify_password(
@@ -224,6 +333,19 @@ class PasswordUtil:
     def get_password_hash(cls, plain_password: str) -> str:
         return cls.pwd_context.hash(plain_password)  # type: ignore
 
+    @classmethod
+    async def averify_password(cls, plain_password: str, hashed_password: str) -> bool:
+        return await cls._run("verify", plain_password, hashed_password)
+
+    @classmethod
+    async def aget_password_hash(cls, plain_password: str) -> str:
+        return await cls._run("hash", plain_password)
+
+    @classmethod
+    async def averify_and_update(cls, plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+        """校验通过且哈希需要升级时返回新哈希"""
+        return await cls._run("verify_and_update", plain_password, hashed_password)
+
 
 class JwtUtil:
     """jwt 工具."""